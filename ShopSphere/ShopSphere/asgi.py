@@ -3,6 +3,10 @@ ASGI config for ShopSphere project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the site with an ASGI server (e.g. ``uvicorn ShopSphere.asgi:application``)
+for the live order updates at /events/: each open stream is then a coroutine
+instead of a blocked WSGI worker.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -0,0 +1,131 @@
+"""
+Live event push.
+
+Order status and location changes are published to named channels
+("order:<id>", "user:<id>", "vendor:<id>", "agent:<user id>", "dispatch")
+and streamed to open pages as server-sent events by ShopSphere/views.py
+event_stream, so tracking pages stop re-fetching my_orders to notice a
+change. Streaming needs the ASGI server (ShopSphere/asgi.py): each open
+stream is a coroutine waiting on a queue, not a worker thread.
+
+The broker is chosen with the EVENTS_BROKER setting. InProcessBroker only
+reaches subscribers in the publishing process, which is enough for a single
+ASGI process; with several, plug in a broker with the same publish /
+subscribe interface backed by a shared pub/sub (e.g. Redis).
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = 'ShopSphere.events.InProcessBroker'
+DEFAULT_QUEUE_SIZE = 100
+
+_event_ids = itertools.count(1)
+
+
+class BaseBroker:
+    """Interface every event broker implements"""
+
+    def publish(self, channels, event):
+        """Deliver event to everyone subscribed to any of channels (once each); returns the number reached"""
+        raise NotImplementedError
+
+    def subscribe(self, channels):
+        """A Subscription to channels, bound to the running event loop"""
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        """Stop delivering to subscription (called when its stream ends)"""
+
+
+class Subscription:
+    """One open stream's queue; events beyond its size push out the oldest"""
+
+    def __init__(self, broker, channels, maxsize):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def _put(self, event):
+        if self.queue.full():
+            # A stalled client only misses stale updates; newer ones describe the current state
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    def deliver(self, event):
+        """Called from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The stream's loop has shut down
+            self.close()
+
+    async def get(self, timeout=None):
+        """The next event, or None if none arrived within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker(BaseBroker):
+    """Channel -> subscriptions map in this process's memory"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, channels, event):
+        with self._lock:
+            targets = set().union(*(self._subscriptions.get(channel, ()) for channel in channels))
+        for subscription in targets:
+            subscription.deliver(event)
+        return len(targets)
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels, getattr(settings, 'EVENTS_QUEUE_SIZE', DEFAULT_QUEUE_SIZE))
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, 'EVENTS_BROKER', None) or DEFAULT_BROKER)()
+
+
+def publish(event_type, data, channels):
+    """Send {id, type, data, sent_at} to channels right away"""
+    event = {'id': next(_event_ids), 'type': event_type, 'data': data, 'sent_at': timezone.now().isoformat()}
+    return get_broker().publish(channels, event)
+
+
+def publish_on_commit(event_type, data, channels):
+    """publish() once the current transaction commits, so nobody hears about rolled-back changes"""
+    transaction.on_commit(lambda: publish(event_type, data, channels))
+
+
+def format_sse(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
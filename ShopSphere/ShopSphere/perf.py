@@ -0,0 +1,180 @@
+"""
+Per-request database and latency profiling.
+
+QueryProfilingMiddleware wraps every request in a query recorder and keeps
+running totals per URL name (route pattern for unnamed URLs). In DEBUG the
+numbers are also returned as X-DB-* response headers; /superAdmin/api/perf/
+serves the aggregated report. Endpoints can be given a query budget through QUERY_BUDGETS; tests
+(or CI) set QUERY_BUDGET_ENFORCE to turn an overrun into an error.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+# Collapse literals so "WHERE id = 1" and "WHERE id = 2" count as the same query
+_NUMBER_RE = re.compile(r'\b\d+\b')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?|[\d.]+|\'[^\']*\')\s*,?)+\)', re.IGNORECASE)
+
+# Shared key for requests no URL pattern matched, so bots probing paths can't grow the stats
+UNRESOLVED = '<unresolved>'
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return ' '.join(sql.split())
+
+
+class QueryRecorder:
+    """connection.execute_wrapper hook collecting SQL timings for one unit of work"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.total_time += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Fingerprints executed more than once, i.e. likely N+1 patterns"""
+        return {sql: n for sql, n in self.fingerprints.items() if n > 1}
+
+
+@contextmanager
+def record_queries():
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        yield recorder
+
+
+@contextmanager
+def query_budget(max_queries, label='block'):
+    """Fail if the wrapped code runs more than max_queries SQL statements"""
+    with record_queries() as recorder:
+        yield recorder
+    if recorder.count > max_queries:
+        raise QueryBudgetExceeded(_budget_message(label, recorder, max_queries))
+
+
+def _budget_message(label, recorder, budget):
+    message = f"{label} ran {recorder.count} queries (budget {budget})"
+    if recorder.duplicates:
+        worst = max(recorder.duplicates.items(), key=lambda item: item[1])
+        message += f"; repeated {worst[1]}x: {worst[0][:200]}"
+    return message
+
+
+class PerfStats:
+    """Thread-safe running totals per URL name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, recorder, elapsed):
+        with self._lock:
+            entry = self._stats.setdefault(name, {
+                'requests': 0,
+                'queries': 0,
+                'max_queries': 0,
+                'sql_time_ms': 0.0,
+                'view_time_ms': 0.0,
+                'max_view_time_ms': 0.0,
+                'duplicates': Counter(),
+            })
+            entry['requests'] += 1
+            entry['queries'] += recorder.count
+            entry['max_queries'] = max(entry['max_queries'], recorder.count)
+            entry['sql_time_ms'] += recorder.total_time * 1000
+            entry['view_time_ms'] += elapsed * 1000
+            entry['max_view_time_ms'] = max(entry['max_view_time_ms'], elapsed * 1000)
+            entry['duplicates'].update(recorder.duplicates)
+
+    def report(self, top_duplicates=5):
+        with self._lock:
+            report = {}
+            for name, entry in self._stats.items():
+                requests = entry['requests']
+                report[name] = {
+                    'requests': requests,
+                    'avg_queries': round(entry['queries'] / requests, 2),
+                    'max_queries': entry['max_queries'],
+                    'avg_sql_time_ms': round(entry['sql_time_ms'] / requests, 2),
+                    'avg_view_time_ms': round(entry['view_time_ms'] / requests, 2),
+                    'max_view_time_ms': round(entry['max_view_time_ms'], 2),
+                    'query_budget': get_query_budgets().get(name),
+                    'duplicate_queries': [
+                        {'sql': sql, 'count': count}
+                        for sql, count in entry['duplicates'].most_common(top_duplicates)
+                    ],
+                }
+            return report
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+perf_stats = PerfStats()
+
+
+def get_query_budgets():
+    return getattr(settings, 'QUERY_BUDGETS', {})
+
+
+def view_key(request):
+    """Stats/budget key: the URL name, else the route pattern, else UNRESOLVED"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED
+    if match.url_name:
+        return match.view_name
+    return match.route or '/'
+
+
+class QueryProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        name = view_key(request)
+        perf_stats.record(name, recorder, elapsed)
+
+        if settings.DEBUG:
+            response['X-DB-Query-Count'] = str(recorder.count)
+            response['X-DB-Time-ms'] = f"{recorder.total_time * 1000:.2f}"
+            response['X-DB-Duplicate-Queries'] = str(sum(n - 1 for n in recorder.duplicates.values()))
+            response['X-View-Time-ms'] = f"{elapsed * 1000:.2f}"
+
+        budget = get_query_budgets().get(name)
+        if budget is not None and recorder.count > budget:
+            if settings.DEBUG:
+                response['X-DB-Budget-Exceeded'] = f"{recorder.count}/{budget}"
+            if getattr(settings, 'QUERY_BUDGET_ENFORCE', False):
+                raise QueryBudgetExceeded(_budget_message(name, recorder, budget))
+
+        return response
@@ -5,6 +5,8 @@ Django settings for ShopSphere project.
 from pathlib import Path
 from datetime import timedelta
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -38,6 +40,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ShopSphere.perf.QueryProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -50,6 +53,16 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'ShopSphere.urls'
 
+# Per-endpoint SQL query budgets, keyed by URL name (ShopSphere/perf.py).
+# Overruns add an X-DB-Budget-Exceeded header in DEBUG and raise when
+# QUERY_BUDGET_ENFORCE is on (set it in tests/CI).
+QUERY_BUDGETS = {
+    'serve_product_image': 5,
+    'serve_product_image_variant': 5,
+    'serve_vendor_document': 5,
+}
+QUERY_BUDGET_ENFORCE = False
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -72,6 +85,28 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent checkouts
+            # queue on the busy timeout instead of failing with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file rather than SQLite's shared in-memory database, so tests that
+        # race threads against each other lock the way the real database does
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    }
+}
+
+# Cache
+# Shared by every worker process, so cached counters invalidated on one
+# (superAdmin/stats.py, unread counts in user/notifications.py) are not served
+# stale by the others. Create the table once with `manage.py createcachetable`;
+# with Redis available, django.core.cache.backends.redis.RedisCache is a
+# drop-in replacement.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'shopsphere_cache',
     }
 }
 
@@ -105,6 +140,69 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Product image store (content-addressed, see vendor/storage.py)
+PRODUCT_IMAGE_STORAGE = 'vendor.storage.FileSystemImageStorage'
+PRODUCT_IMAGE_ROOT = MEDIA_ROOT / 'product_images'
+# 'stream' serves through Django; 'x-sendfile' / 'x-accel-redirect' hand off to the web server
+PRODUCT_IMAGE_SERVE_MODE = 'stream'
+PRODUCT_IMAGE_ACCEL_PREFIX = '/protected/product_images/'
+# Responsive variants generated for every product image (vendor/images.py)
+PRODUCT_IMAGE_VARIANT_WIDTHS = [200, 400, 800]
+PRODUCT_IMAGE_VARIANT_FORMATS = ['webp', 'jpeg']
+
+# Background worker pool (ShopSphere/tasks.py)
+BACKGROUND_WORKERS = 4
+BACKGROUND_TASKS_EAGER = False
+
+# Checkout stock reservations (vendor/inventory.py), in seconds
+STOCK_RESERVATION_TTL = 600
+
+# Product search (vendor/search.py): None picks FTS5 on SQLite, icontains elsewhere
+SEARCH_BACKEND = None
+SEARCH_MAX_RESULTS = 1000
+
+# Catalog facets (vendor/facets.py): price bucket edges and how often counts
+# are recomputed, in seconds
+CATALOG_PRICE_BUCKETS = [0, 500, 1000, 2500, 5000, 10000]
+FACET_REFRESH_INTERVAL = 15 * 60
+
+# Platform commission taken from vendor sales (vendor/analytics.py)
+VENDOR_COMMISSION_RATE = '0.05'
+
+# Platform sales rollup (superAdmin/reporting.py): orders changed within this
+# many seconds wait for the next run
+REPORTING_WATERMARK_LAG = 60
+
+# Delivery dispatch (deliveryAgent/dispatch.py): queue shown to agents,
+# per-agent load cap and push-assignment scoring
+DISPATCH_QUEUE_SIZE = 20
+DISPATCH_MAX_ACTIVE_ORDERS = 3
+DISPATCH_LOAD_PENALTY = 2
+DISPATCH_VEHICLE_SCORES = {'bike': 3, 'scooter': 3, 'car': 2, 'van': 1, 'truck': 1}
+
+# What an agent earns per delivered shipment (deliveryAgent/shipments.py)
+SHIPMENT_EARNING = '40.00'
+
+# Live order updates (ShopSphere/events.py): broker class (None = in-process), events a slow
+# stream may fall behind by, and seconds between keepalives on an idle stream
+EVENTS_BROKER = None
+EVENTS_QUEUE_SIZE = 100
+EVENTS_HEARTBEAT = 15
+
+# Notifications (user/notifications.py): recipients per multi-row INSERT and
+# how long unread counts are cached, in seconds
+NOTIFICATION_BATCH_SIZE = 1000
+NOTIFICATION_UNREAD_CACHE_TTL = 300
+
+# Admin dashboard counters (superAdmin/stats.py) are cached this long, in seconds
+ADMIN_STATS_CACHE_TTL = 60
+
+# How long a stored Idempotency-Key response is replayed (user/idempotency.py), in seconds
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+# How long an unfinished request holds its Idempotency-Key before a retry may
+# run it again, in seconds
+IDEMPOTENCY_KEY_LEASE = 60
+
 # Authentication
 AUTH_USER_MODEL = 'user.AuthUser'
 
@@ -134,6 +232,8 @@ SIMPLE_JWT = {
 
 # CORS Configuration
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5174",
     "http://localhost:5173",
@@ -0,0 +1,50 @@
+"""
+In-process background worker pool.
+
+Used for work that should not hold up the request that triggered it
+(image processing, notification fan-out). Jobs run in threads of this
+process, so they are lost on restart: callers must be able to rebuild
+their results (e.g. through a management command).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'BACKGROUND_WORKERS', 4),
+                    thread_name_prefix='shopsphere-bg',
+                )
+    return _executor
+
+
+def _run(fn, args, kwargs):
+    close_old_connections()
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", getattr(fn, '__name__', fn))
+        raise
+    finally:
+        # Worker threads hold their own DB connection; don't leak it between jobs
+        connection.close()
+
+
+def submit(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) on the worker pool (inline when BACKGROUND_TASKS_EAGER)"""
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        return fn(*args, **kwargs)
+    return _get_executor().submit(_run, fn, args, kwargs)
@@ -4,8 +4,12 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic.base import RedirectView
 
+from . import views
+
 urlpatterns = [
     path('favicon.ico', RedirectView.as_view(url='/static/favicon.ico', permanent=True)),
+    # Live order updates (server-sent events; needs the ASGI server)
+    path('events/', views.event_stream, name='event_stream'),
     path('', include('user.urls')),
     # Django Admin
     path('admin/', admin.site.urls),
@@ -1,4 +1,19 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from deliveryAgent.models import DeliveryProfile
+from user.models import Order
+from vendor.models import VendorProfile
+from . import events
+
+DEFAULT_EVENTS_HEARTBEAT = 15
+# How long browsers wait before reconnecting a dropped stream, in milliseconds
+EVENTS_RECONNECT_MS = 3000
 
 def home(request):
     # Redirect to the main product listing
@@ -8,4 +23,70 @@ def handler404(request, exception):
     return render(request, '404.html', status=404)
 
 def handler500(request):
-    return render(request, '500.html', status=500)
\ No newline at end of file
+    return render(request, '500.html', status=500)
+
+
+def _jwt_user(request):
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def _event_channels(user, order_id=None):
+    """Channels user may follow: one of their orders, or everything addressed to them, their shop and their deliveries"""
+    if order_id is not None:
+        return [f'order:{order_id}'] if Order.objects.filter(pk=order_id, user=user).exists() else None
+    channels = [f'user:{user.id}']
+    vendor_id = VendorProfile.objects.filter(user=user).values_list('id', flat=True).first()
+    if vendor_id is not None:
+        channels.append(f'vendor:{vendor_id}')
+    if DeliveryProfile.objects.filter(user=user, approval_status='approved', is_blocked=False).exists():
+        channels += [f'agent:{user.id}', 'dispatch']
+    return channels
+
+
+async def _stream(channels):
+    heartbeat = getattr(settings, 'EVENTS_HEARTBEAT', DEFAULT_EVENTS_HEARTBEAT)
+    # Subscribe from inside the stream so the queue belongs to the loop serving the response
+    subscription = events.get_broker().subscribe(channels)
+    try:
+        yield f'retry: {EVENTS_RECONNECT_MS}\n\n'
+        while True:
+            event = await subscription.get(timeout=heartbeat)
+            # Comment lines keep proxies from timing out an idle stream
+            yield ': keepalive\n\n' if event is None else events.format_sse(event)
+    finally:
+        subscription.close()
+
+
+async def event_stream(request):
+    """
+    Server-sent events for the signed-in user (session or JWT bearer): order
+    status and location changes for customers, their shipments for vendors,
+    their deliveries and the dispatch queue for agents. ?order=<id> narrows
+    the stream to one of the customer's orders.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Live updates need the ASGI server (ShopSphere/asgi.py)'}, status=503)
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        user = await sync_to_async(_jwt_user)(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
+    try:
+        order_id = int(request.GET['order']) if request.GET.get('order') else None
+    except ValueError:
+        return JsonResponse({'error': 'order must be an integer'}, status=400)
+    channels = await sync_to_async(_event_channels)(user, order_id)
+    if channels is None:
+        return JsonResponse({'error': 'Order not found'}, status=404)
+
+    response = StreamingHttpResponse(_stream(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import user_passes_test
 from vendor.models import VendorProfile, Product
+from superAdmin.stats import dashboard_stats
 
 
 def is_admin(user):
@@ -16,28 +17,22 @@ def admin_dashboard(request):
     This is the main entry point for the default admin.
     """
     
-    # Get statistics
-    total_vendors = VendorProfile.objects.count()
-    pending_vendors = VendorProfile.objects.filter(approval_status='pending').count()
-    approved_vendors = VendorProfile.objects.filter(approval_status='approved').count()
-    rejected_vendors = VendorProfile.objects.filter(approval_status='rejected').count()
-    blocked_vendors = VendorProfile.objects.filter(is_blocked=True).count()
-    
-    total_products = Product.objects.count()
-    blocked_products = Product.objects.filter(is_blocked=True).count()
+    # Get statistics (shared with the superAdmin dashboards, cached)
+    stats = dashboard_stats()
+    vendors, products = stats['vendors'], stats['products']
     
     # Get recent activities
     recent_vendors = VendorProfile.objects.all().order_by('-created_at')[:5]
     recent_products = Product.objects.all().order_by('-created_at')[:5]
 
     context = {
-        'total_vendors': total_vendors,
-        'pending_vendors': pending_vendors,
-        'approved_vendors': approved_vendors,
-        'rejected_vendors': rejected_vendors,
-        'blocked_vendors': blocked_vendors,
-        'total_products': total_products,
-        'blocked_products': blocked_products,
+        'total_vendors': vendors['total'],
+        'pending_vendors': vendors['pending'],
+        'approved_vendors': vendors['approved'],
+        'rejected_vendors': vendors['rejected'],
+        'blocked_vendors': vendors['blocked'],
+        'total_products': products['total'],
+        'blocked_products': products['blocked'],
         'recent_vendors': recent_vendors,
         'recent_products': recent_products,
     }
@@ -100,7 +95,7 @@ def product_list(request):
     block_filter = request.GET.get('blocked', '')
     vendor_filter = request.GET.get('vendor', '')
 
-    products = Product.objects.all().select_related('vendor')
+    products = Product.objects.with_vendor()
 
     if block_filter == 'blocked':
         products = products.filter(is_blocked=True)
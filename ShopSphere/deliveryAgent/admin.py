@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import DeliveryProfile, Order
+from .models import DeliveryProfile, Shipment
 
 class DeliveryProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'vehicle_type', 'approval_status')
@@ -7,4 +7,12 @@ class DeliveryProfileAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'vehicle_number')
 
 admin.site.register(DeliveryProfile, DeliveryProfileAdmin)
-admin.site.register(Order)
\ No newline at end of file
+
+class ShipmentAdmin(admin.ModelAdmin):
+    list_display = ('order', 'vendor', 'status', 'assigned_to', 'created_at', 'delivered_at')
+    list_filter = ('status',)
+    search_fields = ('order__order_number', 'assigned_to__username')
+    raw_id_fields = ('order', 'vendor', 'assigned_to')
+    list_select_related = ('order', 'assigned_to')
+
+admin.site.register(Shipment, ShipmentAdmin)
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Delivery dispatch.
+
+Shipments handed over by vendors form a queue (status AVAILABLE, oldest
+first) served by the (status, created_at) index. Agents take them with
+claim(), a conditional UPDATE ... WHERE status = 'AVAILABLE', so of two
+agents racing for the same shipment exactly one wins without any locking;
+only the winner goes on to update the order and its tracking history
+(shipments.record). Claims made under an agent's load cap first lock the
+agent's DeliveryProfile row, so two claims by the same agent cannot both
+pass the count of their active shipments. assign_orders() pushes queued
+shipments to the best-scoring free agents instead, for
+`manage.py dispatch_orders` run from cron.
+"""
+import heapq
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import shipments
+from .models import DeliveryProfile, Shipment
+
+DEFAULT_QUEUE_SIZE = 20
+DEFAULT_MAX_ACTIVE_ORDERS = 3
+DEFAULT_LOAD_PENALTY = 2
+# Lighter vehicles get through city traffic faster, so they are preferred
+DEFAULT_VEHICLE_SCORES = {'bike': 3, 'scooter': 3, 'car': 2, 'van': 1, 'truck': 1}
+
+
+class AtCapacity(Exception):
+    """Raised when an agent already carries as many shipments as they may"""
+
+    def __init__(self, user_id, limit):
+        self.user_id = user_id
+        self.limit = limit
+        super().__init__(f"Agent {user_id} already has {limit} active shipment(s)")
+
+
+def max_active_orders():
+    return getattr(settings, 'DISPATCH_MAX_ACTIVE_ORDERS', DEFAULT_MAX_ACTIVE_ORDERS)
+
+
+def queue(limit=None):
+    """The oldest shipments waiting for an agent"""
+    limit = limit or getattr(settings, 'DISPATCH_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+    return Shipment.objects.with_details().filter(status='AVAILABLE').order_by('created_at', 'id')[:limit]
+
+
+def active_count(user):
+    return Shipment.objects.filter(assigned_to=user, status='ON_ROUTE').count()
+
+
+def claim(shipment_id, user, max_active=None):
+    """
+    Atomically assign an AVAILABLE shipment to user (or user id); False if someone else got it first.
+
+    With max_active, raises AtCapacity instead if user already has that many
+    shipments ON_ROUTE.
+    """
+    user_id = getattr(user, 'pk', user)
+    with transaction.atomic():
+        if max_active is not None:
+            # Serialise this agent's claims on their profile row: the count and the claim must not interleave
+            list(DeliveryProfile.objects.select_for_update().filter(user_id=user_id).values_list('id', flat=True))
+            if active_count(user_id) >= max_active:
+                raise AtCapacity(user_id, max_active)
+        won = Shipment.objects.filter(pk=shipment_id, status='AVAILABLE').update(
+            status='ON_ROUTE', assigned_to_id=user_id, assigned_at=timezone.now()
+        ) == 1
+        if won:
+            shipments.record(shipment_id, 'ON_ROUTE')
+    return won
+
+
+def claim_next(user, window=10, max_active=None):
+    """
+    Claim one of the oldest queued shipments; returns (shipment id or None, lost races).
+
+    Candidates are tried in random order so agents polling at the same time
+    spread over the head of the queue instead of all racing for one row.
+    max_active is passed on to claim(), which may raise AtCapacity.
+    """
+    lost = 0
+    while True:
+        candidates = list(queue(window).values_list('id', flat=True))
+        if not candidates:
+            return None, lost
+        random.shuffle(candidates)
+        for shipment_id in candidates:
+            if claim(shipment_id, user, max_active=max_active):
+                return shipment_id, lost
+            lost += 1
+
+
+def score(vehicle_type, load):
+    scores = getattr(settings, 'DISPATCH_VEHICLE_SCORES', DEFAULT_VEHICLE_SCORES)
+    penalty = getattr(settings, 'DISPATCH_LOAD_PENALTY', DEFAULT_LOAD_PENALTY)
+    return scores.get(vehicle_type, 0) - penalty * load
+
+
+def available_agents():
+    """[(user id, vehicle type, active shipments)] for approved, unblocked agents with spare capacity"""
+    limit = max_active_orders()
+    agents = (
+        DeliveryProfile.objects.filter(approval_status='approved', is_blocked=False)
+        .annotate(load=Count('user__assigned_shipments', filter=Q(user__assigned_shipments__status='ON_ROUTE')))
+        .filter(load__lt=limit)
+        .values_list('user_id', 'vehicle_type', 'load')
+    )
+    return list(agents)
+
+
+def assign_orders(limit=100):
+    """Push up to limit queued shipments to the best-scoring agents; returns [(shipment id, user id)]"""
+    limit_per_agent = max_active_orders()
+    # Max-heap on score; user id breaks ties deterministically
+    heap = [(-score(vehicle, load), user_id, vehicle, load) for user_id, vehicle, load in available_agents()]
+    heapq.heapify(heap)
+
+    assignments = []
+    for shipment_id in queue(limit).values_list('id', flat=True):
+        if not heap:
+            break
+        _, user_id, vehicle, load = heapq.heappop(heap)
+        try:
+            won = claim(shipment_id, user_id, max_active=limit_per_agent)
+        except AtCapacity:
+            # Filled up by accepts made since available_agents() counted
+            continue
+        if won:
+            assignments.append((shipment_id, user_id))
+            load += 1
+        if load < limit_per_agent:
+            heapq.heappush(heap, (-score(vehicle, load), user_id, vehicle, load))
+    return assignments
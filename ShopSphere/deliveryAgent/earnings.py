@@ -0,0 +1,84 @@
+"""
+Delivery agent earnings.
+
+An agent's earnings are the `earning` of the shipments they delivered.
+Every figure here is a Sum/Count computed by the database over the agent's
+delivered shipments, served by the (assigned_to, status, delivered_at)
+index, so the dashboard no longer loads an agent's whole delivery history.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+
+from . import shipments
+from .models import Shipment
+
+PERIODS = {'daily': TruncDate, 'weekly': TruncWeek}
+
+
+def _start_of(day):
+    return datetime.combine(day, time.min, tzinfo=timezone.get_current_timezone())
+
+
+def delivered(user):
+    return Shipment.objects.filter(assigned_to=user, status='DELIVERED')
+
+
+def complete(shipment_id, user):
+    """Mark the agent's ON_ROUTE shipment delivered; False if it isn't theirs or not on route"""
+    with transaction.atomic():
+        done = Shipment.objects.filter(pk=shipment_id, assigned_to=user, status='ON_ROUTE').update(
+            status='DELIVERED', delivered_at=timezone.now()
+        ) == 1
+        if done:
+            shipments.record(shipment_id, 'DELIVERED')
+    return done
+
+
+def summary(user):
+    """All-time, today's and this week's (from Monday) earnings and delivery counts, in one query"""
+    today = timezone.localdate()
+    today_start = _start_of(today)
+    week_start = _start_of(today - timedelta(days=today.weekday()))
+    totals = delivered(user).aggregate(
+        total=Sum('earning'), deliveries=Count('id'),
+        today=Sum('earning', filter=Q(delivered_at__gte=today_start)),
+        today_deliveries=Count('id', filter=Q(delivered_at__gte=today_start)),
+        week=Sum('earning', filter=Q(delivered_at__gte=week_start)),
+        week_deliveries=Count('id', filter=Q(delivered_at__gte=week_start)),
+    )
+    zero = Decimal('0.00')
+    return {
+        'total_earnings': totals['total'] or zero,
+        'total_deliveries': totals['deliveries'],
+        'today_earnings': totals['today'] or zero,
+        'today_deliveries': totals['today_deliveries'],
+        'week_earnings': totals['week'] or zero,
+        'week_deliveries': totals['week_deliveries'],
+    }
+
+
+def rollup(user, period, start, end):
+    """[{period, earnings, deliveries}] per day or week (keyed by its Monday) over [start, end] (dates, inclusive)"""
+    trunc = PERIODS[period]
+    rows = (
+        delivered(user)
+        .filter(delivered_at__gte=_start_of(start), delivered_at__lt=_start_of(end + timedelta(days=1)))
+        .annotate(period=trunc('delivered_at'))
+        .values('period')
+        .annotate(earnings=Sum('earning'), deliveries=Count('id'))
+        .order_by('period')
+    )
+    return [
+        {
+            # TruncWeek yields a datetime; report the date the week starts on
+            'period': row['period'].date() if isinstance(row['period'], datetime) else row['period'],
+            'earnings': row['earnings'],
+            'deliveries': row['deliveries'],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,130 @@
+import itertools
+import threading
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.db.models import Count
+
+from deliveryAgent import dispatch
+from deliveryAgent.models import DeliveryProfile, Shipment
+from user.models import Order
+
+PREFIX = 'bench'
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate many delivery agents polling the dispatch queue at once and check that "
+        "every shipment is claimed exactly once. Creates its own orders, shipments and users "
+        "(removed afterwards unless --keep is given), so run it against a test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agents', type=int, default=200)
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--threads', type=int, default=32, help="Agents are spread over this many threads")
+        parser.add_argument('--max-active', type=int,
+                            help="Claim under this per-agent load cap (locks each agent's profile row per claim)")
+        parser.add_argument('--keep', action='store_true', help="Leave the generated orders and agents in place")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        run = f"{PREFIX}{int(time.time()) % 100000}"
+        User.objects.bulk_create([
+            User(username=f'{run}-agent{i}', email=f'{run}-agent{i}@example.com')
+            for i in range(options['agents'])
+        ])
+        agents = list(User.objects.filter(username__startswith=f'{run}-agent').values_list('id', flat=True))
+        max_active = options['max_active']
+        if max_active is not None:
+            # The capped claim locks the agent's profile row, so give every agent one
+            DeliveryProfile.objects.bulk_create([
+                DeliveryProfile(user_id=agent_id, address='-', vehicle_type='bike', vehicle_number='-',
+                                driving_license_number='-', approval_status='approved')
+                for agent_id in agents
+            ])
+        customer = User.objects.create(username=f'{run}-customer', email=f'{run}-customer@example.com')
+        Order.objects.bulk_create([
+            Order(user=customer, order_number=f'{run.upper()}-{i:06d}', payment_method='cod')
+            for i in range(options['orders'])
+        ])
+        Shipment.objects.bulk_create([
+            Shipment(order_id=order_id) for order_id in customer.orders.values_list('id', flat=True)
+        ])
+        shipments = Shipment.objects.filter(order__user=customer)
+
+        counts = Counter()
+        lock = threading.Lock()
+        # Agents that hit --max-active; once all have, nobody is left to claim
+        full = set()
+        # Hand the agents out round-robin; each poll is one agent trying to take an order
+        next_agent = itertools.cycle(agents).__next__
+
+        def worker():
+            result = Counter()
+            try:
+                while True:
+                    with lock:
+                        if len(full) == len(agents):
+                            break
+                        agent_id = next_agent()
+                        if agent_id in full:
+                            continue
+                    try:
+                        order_id, lost = dispatch.claim_next(agent_id, max_active=max_active)
+                    except dispatch.AtCapacity:
+                        with lock:
+                            full.add(agent_id)
+                        continue
+                    except OperationalError:
+                        result['errors'] += 1
+                        continue
+                    result['lost_races'] += lost
+                    if order_id is None:
+                        break
+                    result['claimed'] += 1
+            finally:
+                connection.close()
+                with lock:
+                    counts.update(result)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"{options['agents']} agents on {options['threads']} threads claimed "
+                          f"{counts['claimed']} of {options['orders']} orders in {elapsed:.2f}s "
+                          f"({counts['claimed'] / elapsed:.0f}/s)")
+        self.stdout.write(f"  lost races: {counts['lost_races']}  lock errors: {counts['errors']}")
+
+        assigned = shipments.filter(status='ON_ROUTE', assigned_to__isnull=False).count()
+        per_agent = (
+            shipments.filter(assigned_to__isnull=False)
+            .values('assigned_to').annotate(n=Count('id')).order_by('-n').first()
+        )
+        busiest = per_agent['n'] if per_agent else 0
+        expected = options['orders']
+        if max_active is not None:
+            expected = min(expected, len(agents) * max_active)
+        if assigned != counts['claimed'] or assigned != expected:
+            self.stderr.write(self.style.ERROR(
+                f"Inconsistent dispatch: {counts['claimed']} claim(s) reported, {assigned} shipment(s) assigned, "
+                f"{expected} expected"
+            ))
+        elif max_active is not None and busiest > max_active:
+            self.stderr.write(self.style.ERROR(f"Load cap broken: an agent holds {busiest} > {max_active} shipments"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Every shipment claimed exactly once (busiest agent: {busiest})"
+            ))
+
+        if not options['keep']:
+            # Deleting the customer takes its orders, shipments and tracking rows with it
+            User.objects.filter(id__in=agents + [customer.id]).delete()
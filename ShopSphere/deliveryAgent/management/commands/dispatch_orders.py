@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from deliveryAgent.dispatch import assign_orders
+
+
+class Command(BaseCommand):
+    help = "Push queued delivery orders to the best-scoring free agents (run from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help="Most orders to assign in one run")
+
+    def handle(self, *args, **options):
+        assignments = assign_orders(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f"Assigned {len(assignments)} order(s)"))
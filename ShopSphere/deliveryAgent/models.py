@@ -1,5 +1,8 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+from vendor.models import VendorProfile, binary_field_names
 
 class DeliveryProfile(models.Model):
     """Delivery Partner Profile"""
@@ -48,18 +51,29 @@ class DeliveryProfile(models.Model):
         return self.approval_status == 'approved'
 
 
-class Order(models.Model):
+class ShipmentQuerySet(models.QuerySet):
+    def with_vendor(self):
+        """select_related('vendor') without pulling the vendor's document blobs along"""
+        return self.select_related('vendor').defer(
+            *(f'vendor__{name}' for name in binary_field_names(VendorProfile))
+        )
+
+    def with_details(self):
+        """The order, customer, delivery address and vendor a shipment card shows, in the same query"""
+        return self.with_vendor().select_related('order__user', 'order__delivery_address')
+
+
+class Shipment(models.Model):
+    """One vendor's items of a customer order on their way to the customer (see deliveryAgent/shipments.py)"""
     STATUS_CHOICES = [
         ('AVAILABLE', 'Available'),
         ('ON_ROUTE', 'On Route'),
         ('DELIVERED', 'Delivered'),
     ]
 
-    order_id = models.CharField(max_length=10, unique=True)
-    customer_name = models.CharField(max_length=100)
-    vendor_address = models.TextField()
-    delivery_address = models.TextField()
-    earning = models.DecimalField(max_digits=6, decimal_places=2)
+    order = models.ForeignKey('user.Order', on_delete=models.CASCADE, related_name='shipments')
+    vendor = models.ForeignKey('vendor.VendorProfile', on_delete=models.SET_NULL, null=True, blank=True, related_name='shipments')
+    earning = models.DecimalField(max_digits=6, decimal_places=2, default=0)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='AVAILABLE')
 
     assigned_to = models.ForeignKey(
@@ -67,8 +81,40 @@ class Order(models.Model):
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
-        related_name='assigned_orders'
+        related_name='assigned_shipments'
     )
+    created_at = models.DateTimeField(default=timezone.now)
+    assigned_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ShipmentQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'vendor'], name='unique_shipment_per_order_vendor'),
+        ]
+        indexes = [
+            # Dispatch queue: oldest AVAILABLE shipments first (deliveryAgent/dispatch.py)
+            models.Index(fields=['status', 'created_at']),
+            # An agent's active / delivered shipments
+            models.Index(fields=['assigned_to', 'status']),
+            # Earnings totals, rollups and delivery history (deliveryAgent/earnings.py)
+            models.Index(fields=['assigned_to', 'status', 'delivered_at']),
+        ]
 
     def __str__(self):
-        return self.order_id
+        return f"{self.order.order_number} / {self.vendor_id or '-'}"
+
+    @property
+    def customer_name(self):
+        address = self.order.delivery_address
+        return address.name if address else self.order.user.username
+
+    @property
+    def pickup_address(self):
+        return self.vendor.address if self.vendor_id else ''
+
+    @property
+    def delivery_address(self):
+        address = self.order.delivery_address
+        return address.full_address if address else ''
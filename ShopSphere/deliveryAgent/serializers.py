@@ -0,0 +1,14 @@
+from rest_framework import serializers
+
+from .models import Shipment
+
+
+class DeliveredShipmentSerializer(serializers.ModelSerializer):
+    order_number = serializers.CharField(source='order.order_number', read_only=True)
+
+    class Meta:
+        model = Shipment
+        fields = [
+            'id', 'order_number', 'customer_name', 'pickup_address', 'delivery_address',
+            'earning', 'assigned_at', 'delivered_at'
+        ]
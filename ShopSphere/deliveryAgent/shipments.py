@@ -0,0 +1,142 @@
+"""
+Shipments.
+
+A Shipment is one vendor's items of a customer order (user.Order) on their
+way to the customer, and the single row agents, vendors and customers all
+read: agents through the (status, created_at) and (assigned_to, status)
+indexes, vendors and customers by joining OrderItem.shipment and
+OrderTracking.shipment back to it. The vendor hands its items over with
+create_shipment(); dispatch.claim() and earnings.complete() move it on.
+Every transition goes through record(), which, in the same transaction,
+sets the items' vendor_status, moves the order's status along and adds an
+OrderTracking row, so nothing copies order details into a second table.
+Once committed, each transition (and each agent location ping) is pushed
+to the order's customer, vendor and agent through ShopSphere/events.py,
+and each transition leaves the customer a notification.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from ShopSphere import events
+from user import notifications
+from user.models import Order, OrderItem, OrderTracking
+from .models import Shipment
+
+DEFAULT_EARNING = Decimal('40.00')
+
+# shipment status -> OrderItem.vendor_status of the items it carries
+ITEM_STATUS = {'AVAILABLE': 'shipped', 'ON_ROUTE': 'out_for_delivery', 'DELIVERED': 'delivered'}
+TRACKING_STATUS = {'AVAILABLE': 'Shipped', 'ON_ROUTE': 'Out for delivery', 'DELIVERED': 'Delivered'}
+# Orders in any other status (cancelled, returned, delivered) get no new shipments
+SHIPPABLE_ORDER_STATUSES = ('pending', 'confirmed', 'shipping')
+
+
+class NotShippable(Exception):
+    """Raised when the order's status rules out handing its items over for delivery"""
+
+    def __init__(self, order_id, status):
+        self.order_id = order_id
+        self.status = status
+        super().__init__(f"Order {order_id} is {status} and cannot be shipped")
+
+
+def earning():
+    return Decimal(str(getattr(settings, 'SHIPMENT_EARNING', DEFAULT_EARNING)))
+
+
+def _parties(shipment_id, **filters):
+    return Shipment.objects.filter(pk=shipment_id, **filters).values(
+        'order_id', 'order__order_number', 'order__user_id', 'vendor_id', 'assigned_to_id'
+    ).first()
+
+
+def channels(parties, dispatch=False):
+    """Event channels of everyone following a shipment; dispatch adds the agents' open-queue channel"""
+    names = [f"order:{parties['order_id']}", f"user:{parties['order__user_id']}"]
+    if parties['vendor_id']:
+        names.append(f"vendor:{parties['vendor_id']}")
+    if parties['assigned_to_id']:
+        names.append(f"agent:{parties['assigned_to_id']}")
+    if dispatch:
+        names.append('dispatch')
+    return names
+
+
+def record(shipment_id, status, location=''):
+    """Mirror a shipment transition onto its items, its order and the order's tracking history (call inside the transition's transaction)"""
+    parties = _parties(shipment_id)
+    order_id = parties['order_id']
+    OrderItem.objects.filter(shipment_id=shipment_id).update(vendor_status=ITEM_STATUS[status])
+
+    now = timezone.now()
+    # update() skips auto_now, and superAdmin/reporting.py picks up changed orders by updated_at
+    orders = Order.objects.filter(pk=order_id)
+    if status != 'DELIVERED':
+        orders.filter(status__in=['pending', 'confirmed']).update(status='shipping', updated_at=now)
+    elif not OrderItem.objects.filter(order_id=order_id).exclude(vendor_status__in=['delivered', 'cancelled']).exists():
+        # Only an order under way can arrive; a cancelled one must not turn into delivered
+        orders.filter(status='shipping').update(status='delivered', delivered_at=now, updated_at=now)
+
+    tracking = OrderTracking.objects.create(
+        order_id=order_id, shipment_id=shipment_id, status=TRACKING_STATUS[status], location=location
+    )
+    events.publish_on_commit('shipment.status', {
+        'order_id': order_id, 'shipment_id': shipment_id, 'status': status,
+        'tracking': tracking.status, 'location': location, 'timestamp': tracking.timestamp,
+    }, channels(parties, dispatch=status != 'DELIVERED'))
+    notifications.notify(
+        parties['order__user_id'], 'delivery', f"Order {parties['order__order_number']}: {tracking.status}",
+        f"Your order {parties['order__order_number']} is {tracking.status.lower()}.", related_order=order_id,
+    )
+
+
+def update_location(shipment_id, user, location):
+    """Record where the agent carrying an ON_ROUTE shipment is; False if it isn't theirs or not on route"""
+    parties = _parties(shipment_id, assigned_to=user, status='ON_ROUTE')
+    if parties is None:
+        return False
+    # Pings leave updated_at alone: they change nothing superAdmin/reporting.py counts
+    Order.objects.filter(pk=parties['order_id']).update(tracked_location=location)
+    events.publish_on_commit('shipment.location', {
+        'order_id': parties['order_id'], 'shipment_id': shipment_id, 'location': location,
+    }, channels(parties))
+    return True
+
+
+def create_shipment(order, vendor):
+    """
+    Hand vendor's unshipped items of order over for delivery.
+
+    Returns the shipment, or None if nothing is left to ship; raises
+    NotShippable if the order is cancelled or otherwise past shipping.
+    """
+    items = OrderItem.objects.filter(order=order, vendor=vendor, shipment__isnull=True).exclude(vendor_status='cancelled')
+    try:
+        with transaction.atomic():
+            # Lock the order so a cancellation can't land between this check and the shipment
+            status = Order.objects.select_for_update().filter(pk=order.pk).values_list('status', flat=True).first()
+            if status not in SHIPPABLE_ORDER_STATUSES:
+                raise NotShippable(order.pk, status)
+            item_ids = list(items.select_for_update().values_list('id', flat=True))
+            if not item_ids:
+                return None
+            shipment = Shipment.objects.create(order=order, vendor=vendor, earning=earning())
+            OrderItem.objects.filter(id__in=item_ids).update(shipment=shipment)
+            record(shipment.id, 'AVAILABLE', location=vendor.address)
+    except IntegrityError:
+        # The vendor's items of this order were handed over by a concurrent request
+        return None
+    return shipment
+
+
+def for_order(order):
+    """An order's shipments with their vendor, agent and items, for tracking pages"""
+    return (
+        order.shipments.with_vendor()
+        .select_related('assigned_to')
+        .prefetch_related('items')
+        .order_by('created_at', 'id')
+    )
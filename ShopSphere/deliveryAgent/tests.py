@@ -1,3 +1,106 @@
-from django.test import TestCase
+import threading
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from user.models import AuthUser, Order, OrderTracking
+from . import dispatch
+from .models import DeliveryProfile, Shipment
+
+
+def make_agent(username, vehicle_type='bike'):
+    user = AuthUser.objects.create_user(username=username, email=f'{username}@example.com', password='pw')
+    DeliveryProfile.objects.create(
+        user=user, address='a', vehicle_type=vehicle_type, vehicle_number='1',
+        driving_license_number='1', approval_status='approved',
+    )
+    return user
+
+
+def make_shipments(count):
+    customer = AuthUser.objects.create_user(username='customer', email='customer@example.com', password='pw')
+    return [
+        Shipment.objects.create(
+            order=Order.objects.create(user=customer, order_number=f'ORD{i}', payment_method='cod'),
+            earning=Decimal('40.00'),
+        )
+        for i in range(count)
+    ]
+
+
+class ClaimTests(TestCase):
+    def setUp(self):
+        self.bike = make_agent('bike')
+        self.van = make_agent('van', 'van')
+
+    def test_second_claim_loses(self):
+        shipment = make_shipments(1)[0]
+
+        self.assertTrue(dispatch.claim(shipment.id, self.bike))
+        self.assertFalse(dispatch.claim(shipment.id, self.van))
+
+        shipment.refresh_from_db()
+        self.assertEqual((shipment.status, shipment.assigned_to), ('ON_ROUTE', self.bike))
+        self.assertEqual(Order.objects.get(pk=shipment.order_id).status, 'shipping')
+
+    def test_claim_respects_load_cap(self):
+        first, second = make_shipments(2)
+        dispatch.claim(first.id, self.bike, max_active=1)
+
+        with self.assertRaises(dispatch.AtCapacity):
+            dispatch.claim(second.id, self.bike, max_active=1)
+        self.assertEqual(Shipment.objects.get(pk=second.id).status, 'AVAILABLE')
+
+    def test_accept_order_only_claims_on_post(self):
+        shipment = make_shipments(1)[0]
+        self.client.force_login(self.van)
+
+        self.assertEqual(self.client.get(f'/delivery/accept-order/{shipment.id}/').status_code, 405)
+        self.assertEqual(Shipment.objects.get(pk=shipment.id).status, 'AVAILABLE')
+
+        self.client.post(f'/delivery/accept-order/{shipment.id}/')
+        self.assertEqual(Shipment.objects.get(pk=shipment.id).assigned_to, self.van)
+
+
+class ClaimRaceTests(TransactionTestCase):
+    def race(self, claims):
+        """Run claims [(shipment_id, agent, max_active), ...] on their own threads at once"""
+        start = threading.Barrier(len(claims))
+        results = []
+
+        def run(shipment_id, agent, max_active):
+            try:
+                start.wait()
+                results.append(dispatch.claim(shipment_id, agent, max_active=max_active))
+            except dispatch.AtCapacity:
+                results.append('at capacity')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=claim) for claim in claims]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(results, key=str)
+
+    def test_one_agent_wins_a_contested_shipment(self):
+        agents = [make_agent(f'agent{i}') for i in range(4)]
+        shipment = make_shipments(1)[0]
+
+        results = self.race([(shipment.id, agent, None) for agent in agents])
+
+        self.assertEqual(results, [False, False, False, True])
+        shipment.refresh_from_db()
+        self.assertIn(shipment.assigned_to, agents)
+        self.assertEqual(OrderTracking.objects.filter(shipment_id=shipment.id).count(), 1)
+
+    def test_concurrent_claims_cannot_exceed_load_cap(self):
+        agent = make_agent('agent')
+        shipments = make_shipments(3)
+
+        results = self.race([(shipment.id, agent, 1) for shipment in shipments])
+
+        self.assertEqual(results, [True, 'at capacity', 'at capacity'])
+        self.assertEqual(dispatch.active_count(agent), 1)
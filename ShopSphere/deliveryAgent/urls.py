@@ -16,4 +16,10 @@ urlpatterns = [
     # Delivery Agent Dashboard & Orders
     path('dashboard/', views.delivery_dashboard, name='delivery_dashboard'),
     path('accept-order/<int:order_id>/', views.accept_order, name='accept_order'),
-]
\ No newline at end of file
+    path('complete-order/<int:order_id>/', views.complete_order, name='complete_order'),
+    path('orders/<int:order_id>/location/', views.update_location, name='update_location'),
+
+    # Earnings & History
+    path('earnings/', views.earnings_report, name='delivery_earnings'),
+    path('history/', views.delivery_history, name='delivery_history'),
+]
@@ -2,19 +2,27 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import HttpResponseNotAllowed, JsonResponse
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django.db import transaction
 from django.conf import settings
 from django.core.mail import send_mail
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 import random
 
-from .models import DeliveryProfile, Order
+from ShopSphere.pagination import KeysetPagination
+from . import dispatch, earnings, shipments
+from .models import DeliveryProfile, Shipment
+from .serializers import DeliveredShipmentSerializer
 
 User = get_user_model()
 
+RECENT_DELIVERIES = 10
+MAX_EARNINGS_DAYS = 3 * 366
+
 # ============================================================================
 # AUTHENTICATION VIEWS - DELIVERY PARTNER REGISTRATION AND LOGIN
 # ============================================================================
@@ -214,40 +222,110 @@ def delivery_dashboard(request):
     except DeliveryProfile.DoesNotExist:
         return redirect('delivery_login')
         
-    # Ensure these queries work with your Order model
-    available_orders = Order.objects.filter(status='AVAILABLE')
-    delivered_orders = Order.objects.filter(assigned_to=profile, status='DELIVERED')
-    active_orders = Order.objects.filter(assigned_to=profile, status='ON_ROUTE')
-
-    # Calculate earnings (using shipping_cost as proxy)
-    total_earnings = sum(order.shipping_cost for order in delivered_orders)
-
-    # Annotate orders with 'earning' for template compatibility
-    for order in available_orders:
-        order.earning = order.shipping_cost
-    
-    for order in delivered_orders:
-        order.earning = order.shipping_cost
+    # Only the head of the dispatch queue, not every open order
+    available_orders = dispatch.queue()
+    active_orders = list(
+        Shipment.objects.with_details().filter(assigned_to=request.user, status='ON_ROUTE').order_by('assigned_at')
+    )
+    # The full history is paged through delivery_history
+    delivered_orders = earnings.delivered(request.user).with_details().order_by('-delivered_at', '-id')[:RECENT_DELIVERIES]
 
     context = {
         'profile': profile,
         'available_orders': available_orders,
+        'active_orders': active_orders,
         'delivered_orders': delivered_orders,
-        'active_orders_count': active_orders.count(),
-        'total_earnings': total_earnings,
+        'active_orders_count': len(active_orders),
+        **earnings.summary(request.user),
     }
     return render(request, 'delivery_agent/delivery_dashboard.html', context)
     
 @login_required(login_url='delivery_login')
 def accept_order(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    shipment = get_object_or_404(Shipment.objects.select_related('order'), id=order_id)
+    profile = getattr(request.user, 'delivery_profile', None)
 
-    if order.status == 'AVAILABLE':
-        order.status = 'ON_ROUTE'
-        order.assigned_to = request.user
-        order.save()
-        messages.success(request, f"Order {order.order_id} accepted!")
+    if profile is None or not profile.is_approved or profile.is_blocked:
+        messages.error(request, "Only approved delivery partners can accept orders.")
     else:
-        messages.error(request, "This order is no longer available.")
+        try:
+            if dispatch.claim(shipment.id, request.user, max_active=dispatch.max_active_orders()):
+                messages.success(request, f"Order {shipment.order.order_number} accepted!")
+            else:
+                messages.error(request, "This order is no longer available.")
+        except dispatch.AtCapacity:
+            messages.error(request, "Finish your current deliveries before accepting another order.")
+
+    return redirect('delivery_dashboard')
 
-    return redirect('delivery_dashboard')
\ No newline at end of file
+
+@login_required(login_url='delivery_login')
+def complete_order(request, order_id):
+    shipment = get_object_or_404(Shipment.objects.select_related('order'), id=order_id)
+
+    if request.method == 'POST' and earnings.complete(shipment.id, request.user):
+        messages.success(request, f"Order {shipment.order.order_number} delivered!")
+    else:
+        messages.error(request, "This order is not one of your active deliveries.")
+
+    return redirect('delivery_dashboard')
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def update_location(request, order_id):
+    """Report where the agent is with an ON_ROUTE shipment; pushed live to the customer's tracking page"""
+    location = str(request.data.get('location', '')).strip()
+    if not location or len(location) > 255:
+        return Response({'error': 'location must be 1-255 characters'}, status=400)
+    if not shipments.update_location(order_id, request.user, location):
+        return Response({'error': 'This order is not one of your active deliveries'}, status=404)
+    return Response({'shipment_id': order_id, 'location': location})
+
+
+class DeliveryHistoryPagination(KeysetPagination):
+    ordering = ('delivered_at', 'id')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def delivery_history(request):
+    """The agent's delivered shipments, newest first, keyset-paginated"""
+    queryset = earnings.delivered(request.user).with_details().filter(delivered_at__isnull=False)
+    paginator = DeliveryHistoryPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    return paginator.get_paginated_response(DeliveredShipmentSerializer(page, many=True).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def earnings_report(request):
+    """
+    Earnings totals plus a per-day (?period=daily, default) or per-week
+    (?period=weekly) series over ?start=YYYY-MM-DD&end=YYYY-MM-DD.
+    """
+    period = request.query_params.get('period', 'daily')
+    if period not in earnings.PERIODS:
+        return Response({'error': f"period must be one of: {', '.join(earnings.PERIODS)}"}, status=400)
+
+    today = timezone.localdate()
+    default_days = 7 * 12 if period == 'weekly' else 30
+    try:
+        end = parse_date(request.query_params['end']) if request.query_params.get('end') else today
+        start = parse_date(request.query_params['start']) if request.query_params.get('start') else end - timezone.timedelta(days=default_days - 1)
+    except ValueError:
+        start = end = None
+    if start is None or end is None or start > end:
+        return Response({'error': 'start and end must be YYYY-MM-DD dates with start <= end'}, status=400)
+    if (end - start).days >= MAX_EARNINGS_DAYS:
+        return Response({'error': f'Date range is limited to {MAX_EARNINGS_DAYS} days'}, status=400)
+
+    return Response({
+        **earnings.summary(request.user),
+        'period': period,
+        'start': start,
+        'end': end,
+        'series': earnings.rollup(request.user, period, start, end),
+    })
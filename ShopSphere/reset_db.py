@@ -54,6 +54,7 @@ def reset_database():
     # 5. Run migrate
     print("\n🔄 Running migrate...")
     call_command('migrate')
+    call_command('createcachetable')
 
     print("\n✅ SUCCESS: Database reset complete!")
 
@@ -11,6 +11,7 @@ from django.core.management import call_command
 try:
     print("Running migrate...")
     call_command('migrate', verbosity=2)
+    call_command('createcachetable')
     print("\nMigrations applied successfully!")
 except Exception as e:
     print(f"\nError: {e}")
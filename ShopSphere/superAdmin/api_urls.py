@@ -2,7 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .api_views import (
     VendorRequestViewSet, VendorManagementViewSet, ProductManagementViewSet,
-    DeliveryAgentRequestViewSet, DeliveryAgentManagementViewSet, DashboardView
+    DeliveryAgentRequestViewSet, DeliveryAgentManagementViewSet, DashboardView,
+    PerfReportView, SalesAnalyticsView, PromotionView
 )
 
 router = DefaultRouter()
@@ -15,6 +16,9 @@ router.register(r'delivery-agents', DeliveryAgentManagementViewSet, basename='de
 urlpatterns = [
     # Dashboard
     path('dashboard/', DashboardView.as_view(), name='admin_dashboard_api'),
+    path('perf/', PerfReportView.as_view(), name='admin_perf_report'),
+    path('analytics/sales/', SalesAnalyticsView.as_view(), name='admin_sales_analytics'),
+    path('notifications/promotion/', PromotionView.as_view(), name='admin_send_promotion'),
     
     # Router endpoints
     path('', include(router.urls)),
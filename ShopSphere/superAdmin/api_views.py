@@ -1,13 +1,23 @@
 from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from django.contrib.auth import get_user_model
 # User = get_user_model() - Moved inside functions to avoid AppRegistryNotReady error
 
 from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from ShopSphere.pagination import KeysetPagination
+from ShopSphere.perf import perf_stats
 from vendor.models import VendorProfile, Product
+from vendor.search import get_search_backend
 from deliveryAgent.models import DeliveryProfile
+from user import notifications
+from . import reporting
+from .exports import EXPORT_FORMATS, stream_export
+from .moderation import TARGETS, bulk_moderate, notify_owners
+from .stats import dashboard_stats, invalidate_dashboard_stats
 from .models import VendorApprovalLog, ProductApprovalLog, DeliveryAgentApprovalLog
 from .serializers import (
     VendorApprovalLogSerializer, ProductApprovalLogSerializer,
@@ -19,7 +29,7 @@ from .serializers import (
     AdminDeliveryAgentDetailSerializer, AdminDeliveryAgentListSerializer,
     ApproveDeliveryAgentSerializer, RejectDeliveryAgentSerializer,
     BlockDeliveryAgentSerializer, UnblockDeliveryAgentSerializer,
-    DeliveryAgentApprovalLogSerializer
+    DeliveryAgentApprovalLogSerializer, BulkModerationSerializer, PromotionSerializer
 )
 
 class IsAdminUser(IsAuthenticated):
@@ -31,14 +41,82 @@ class AdminLoginRequiredMixin:
     """Ensure user is admin"""
     permission_classes = [IsAdminUser]
 
-class VendorRequestViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
+class EagerLoadingMixin:
+    """
+    Read requests load everything `eager_loading_serializer` renders up front
+    (its setup_eager_loading), so lists cost a fixed number of queries. Writes
+    skip it: their responses must include the approval log they just added.
+    """
+    eager_loading_serializer = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method in SAFE_METHODS:
+            serializer_class = self.eager_loading_serializer or self.get_serializer_class()
+            queryset = serializer_class.setup_eager_loading(queryset)
+        return queryset
+
+class BulkModerationMixin:
+    """
+    POST <list url>/bulk/ {"action", "ids", "reason"} applies one of
+    `bulk_actions` to up to MAX_BULK_IDS objects in a single transaction and
+    reports a result per id (see moderation.py).
+    """
+    moderation_target = None
+    bulk_actions = ()
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        target = TARGETS[self.moderation_target]
+        serializer = BulkModerationSerializer(
+            data=request.data, actions=self.bulk_actions,
+            reason_required=[name for name in self.bulk_actions if target.actions[name].reason_required],
+        )
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        updated, results = bulk_moderate(
+            self.moderation_target, data['action'], data['ids'], request.user, data['reason']
+        )
+        return Response({
+            'action': data['action'],
+            'updated': updated,
+            'results': results,
+        })
+
+class PaginatedExportMixin:
+    """
+    List responses are keyset-paginated ({next, next_cursor, results});
+    ?export=csv|ndjson streams every matching row instead (see exports.py).
+    """
+    pagination_class = KeysetPagination
+    export_name = 'export'
+
+    def list_response(self, queryset, serializer_class):
+        export_format = self.request.query_params.get('export')
+        if export_format:
+            if export_format not in EXPORT_FORMATS:
+                return Response(
+                    {'error': f"export must be one of: {', '.join(EXPORT_FORMATS)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return stream_export(queryset.order_by('id'), serializer_class, export_format, self.export_name)
+
+        page = self.paginate_queryset(queryset)
+        serializer = serializer_class(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+class VendorRequestViewSet(AdminLoginRequiredMixin, EagerLoadingMixin, PaginatedExportMixin, BulkModerationMixin, viewsets.ModelViewSet):
     """Manage vendor approval requests"""
     queryset = VendorProfile.objects.filter(approval_status='pending')
     serializer_class = AdminVendorDetailSerializer
     permission_classes = [IsAdminUser]
+    export_name = 'vendor-requests'
+    moderation_target = 'vendor'
+    bulk_actions = ('approve', 'reject')
     
     def list(self, request, *args, **kwargs):
-        queryset = VendorProfile.objects.filter(approval_status='pending')
+        queryset = self.get_queryset()
         
         search = request.query_params.get('search', None)
         if search:
@@ -47,8 +125,7 @@ class VendorRequestViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
                 Q(user__email__icontains=search)
             )
         
-        serializer = AdminVendorDetailSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset, AdminVendorDetailSerializer)
     
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
@@ -71,6 +148,8 @@ class VendorRequestViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
             action='approved',
             reason=serializer.validated_data.get('reason', '')
         )
+        invalidate_dashboard_stats()
+        notify_owners('vendor', 'approve', [vendor.id])
         
         return Response({
             'message': 'Vendor approved successfully',
@@ -99,19 +178,25 @@ class VendorRequestViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
             action='rejected',
             reason=serializer.validated_data['reason']
         )
+        invalidate_dashboard_stats()
+        notify_owners('vendor', 'reject', [vendor.id], serializer.validated_data['reason'])
         
         return Response({
             'message': 'Vendor rejected successfully',
             'vendor': AdminVendorDetailSerializer(vendor).data
         })
 
-class VendorManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
+class VendorManagementViewSet(AdminLoginRequiredMixin, EagerLoadingMixin, PaginatedExportMixin, BulkModerationMixin, viewsets.ModelViewSet):
     queryset = VendorProfile.objects.exclude(approval_status='pending')
     serializer_class = AdminVendorListSerializer
+    eager_loading_serializer = AdminVendorDetailSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
+    export_name = 'vendors'
+    moderation_target = 'vendor'
+    bulk_actions = ('block', 'unblock')
     
     def list(self, request, *args, **kwargs):
-        queryset = VendorProfile.objects.all()
+        queryset = AdminVendorListSerializer.setup_eager_loading(VendorProfile.objects.all())
         
         status_filter = request.query_params.get('status', None)
         if status_filter:
@@ -131,11 +216,11 @@ class VendorManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
         elif blocked_filter == 'active':
             queryset = queryset.filter(is_blocked=False)
         
-        serializer = AdminVendorListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset, AdminVendorListSerializer)
     
-    @action(detail=True, methods=['get'])
-    def detail(self, request, pk=None):
+    # Not named `detail`: DRF sets that attribute to a bool on every viewset instance
+    @action(detail=True, methods=['get'], url_path='detail')
+    def details(self, request, pk=None):
         vendor = self.get_object()
         serializer = AdminVendorDetailSerializer(vendor)
         return Response(serializer.data)
@@ -159,6 +244,7 @@ class VendorManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
             action='blocked',
             reason=serializer.validated_data['reason']
         )
+        invalidate_dashboard_stats()
         
         return Response({
             'message': 'Vendor blocked successfully',
@@ -182,19 +268,24 @@ class VendorManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
             action='unblocked',
             reason=serializer.validated_data.get('reason', '')
         )
+        invalidate_dashboard_stats()
         
         return Response({
             'message': 'Vendor unblocked successfully',
             'vendor': AdminVendorDetailSerializer(vendor).data
         })
 
-class ProductManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
+class ProductManagementViewSet(AdminLoginRequiredMixin, EagerLoadingMixin, PaginatedExportMixin, BulkModerationMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = AdminProductListSerializer
+    eager_loading_serializer = AdminProductDetailSerializer
     permission_classes = [IsAdminUser]
+    export_name = 'products'
+    moderation_target = 'product'
+    bulk_actions = ('block', 'unblock')
     
     def list(self, request, *args, **kwargs):
-        queryset = Product.objects.all()
+        queryset = AdminProductListSerializer.setup_eager_loading(Product.objects.all())
         
         status_filter = request.query_params.get('status', None)
         if status_filter:
@@ -208,20 +299,16 @@ class ProductManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
         
         search = request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(vendor__shop_name__icontains=search)
-            )
+            queryset = get_search_backend().filter(queryset, search)
         
         vendor_id = request.query_params.get('vendor_id', None)
         if vendor_id:
             queryset = queryset.filter(vendor_id=vendor_id)
         
-        serializer = AdminProductListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset, AdminProductListSerializer)
     
-    @action(detail=True, methods=['get'])
-    def detail(self, request, pk=None):
+    @action(detail=True, methods=['get'], url_path='detail')
+    def details(self, request, pk=None):
         product = self.get_object()
         serializer = AdminProductDetailSerializer(product)
         return Response(serializer.data)
@@ -235,7 +322,7 @@ class ProductManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
         
         product.is_blocked = True
         product.blocked_reason = serializer.validated_data['reason']
-        product.save()
+        product.save(update_fields=['is_blocked', 'blocked_reason', 'updated_at'])
         
         ProductApprovalLog.objects.create(
             product=product,
@@ -243,6 +330,7 @@ class ProductManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
             action='blocked',
             reason=serializer.validated_data['reason']
         )
+        invalidate_dashboard_stats()
         
         return Response({
             'message': 'Product blocked successfully',
@@ -258,7 +346,7 @@ class ProductManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
         
         product.is_blocked = False
         product.blocked_reason = ''
-        product.save()
+        product.save(update_fields=['is_blocked', 'blocked_reason', 'updated_at'])
         
         ProductApprovalLog.objects.create(
             product=product,
@@ -266,6 +354,7 @@ class ProductManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
             action='unblocked',
             reason=serializer.validated_data.get('reason', '')
         )
+        invalidate_dashboard_stats()
         
         return Response({
             'message': 'Product unblocked successfully',
@@ -277,51 +366,86 @@ class DashboardView(AdminLoginRequiredMixin, generics.GenericAPIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
     
     def get(self, request):
-        total_vendors = VendorProfile.objects.count()
-        pending_vendors = VendorProfile.objects.filter(approval_status='pending').count()
-        approved_vendors = VendorProfile.objects.filter(approval_status='approved').count()
-        blocked_vendors = VendorProfile.objects.filter(is_blocked=True).count()
-        
-        total_products = Product.objects.count()
-        pending_products = Product.objects.filter(status='pending').count()
-        approved_products = Product.objects.filter(status='approved').count()
-        blocked_products = Product.objects.filter(is_blocked=True).count()
-        
-        total_agents = DeliveryProfile.objects.count()
-        pending_agents = DeliveryProfile.objects.filter(approval_status='pending').count()
-        active_agents = DeliveryProfile.objects.filter(approval_status='approved', is_blocked=False).count()
-        blocked_agents = DeliveryProfile.objects.filter(is_blocked=True).count()
-        
+        return Response(dashboard_stats())
+
+
+class PerfReportView(AdminLoginRequiredMixin, generics.GenericAPIView):
+    """Aggregated per-endpoint query counts, SQL time and latency"""
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response(perf_stats.report())
+
+    def delete(self, request):
+        perf_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class PromotionView(AdminLoginRequiredMixin, generics.GenericAPIView):
+    """
+    Send a promotion notification to every active user, or those with role.
+    Written in batches on the background pool, so this returns before the
+    notifications exist.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    serializer_class = PromotionSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        notifications.send_promotion(**serializer.validated_data)
+        return Response({'message': 'Promotion queued'}, status=status.HTTP_202_ACCEPTED)
+
+
+MAX_REPORT_DAYS = 3 * 366
+
+
+class SalesAnalyticsView(AdminLoginRequiredMixin, generics.GenericAPIView):
+    """
+    Platform orders, GMV, items and refunds for ?start=YYYY-MM-DD&end=YYYY-MM-DD,
+    optionally broken down by ?dimension=vendor|category|payment_method.
+    Read from the daily rollup (see reporting.py), which lags by one cron run.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        today = timezone.localdate()
+        try:
+            end = parse_date(request.query_params['end']) if request.query_params.get('end') else today
+            start = parse_date(request.query_params['start']) if request.query_params.get('start') else end - timezone.timedelta(days=29)
+        except ValueError:
+            start = end = None
+        if start is None or end is None or start > end:
+            return Response({'error': 'start and end must be YYYY-MM-DD dates with start <= end'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days >= MAX_REPORT_DAYS:
+            return Response({'error': f'Date range is limited to {MAX_REPORT_DAYS} days'}, status=status.HTTP_400_BAD_REQUEST)
+
+        dimension = request.query_params.get('dimension', 'total')
+        if dimension not in reporting.DIMENSIONS:
+            return Response(
+                {'error': f"dimension must be one of: {', '.join(reporting.DIMENSIONS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         return Response({
-            'vendors': {
-                'total': total_vendors,
-                'pending': pending_vendors,
-                'approved': approved_vendors,
-                'blocked': blocked_vendors
-            },
-            'products': {
-                'total': total_products,
-                'pending': pending_products,
-                'approved': approved_products,
-                'blocked': blocked_products
-            },
-            'delivery_agents': {
-                'total': total_agents,
-                'pending': pending_agents,
-                'active': active_agents,
-                'blocked': blocked_agents
-            }
+            'start': start,
+            'end': end,
+            'dimension': dimension,
+            **reporting.report(start, end, dimension),
         })
 
 
-class DeliveryAgentRequestViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
+class DeliveryAgentRequestViewSet(AdminLoginRequiredMixin, EagerLoadingMixin, PaginatedExportMixin, BulkModerationMixin, viewsets.ModelViewSet):
     """Manage delivery agent approval requests"""
     queryset = DeliveryProfile.objects.filter(approval_status='pending')
     serializer_class = AdminDeliveryAgentDetailSerializer
     permission_classes = [IsAdminUser]
+    export_name = 'delivery-agent-requests'
+    moderation_target = 'delivery_agent'
+    bulk_actions = ('approve', 'reject')
     
     def list(self, request, *args, **kwargs):
-        queryset = DeliveryProfile.objects.filter(approval_status='pending')
+        queryset = self.get_queryset()
         
         search = request.query_params.get('search', None)
         if search:
@@ -330,8 +454,7 @@ class DeliveryAgentRequestViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet
                 Q(vehicle_number__icontains=search)
             )
         
-        serializer = AdminDeliveryAgentDetailSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset, AdminDeliveryAgentDetailSerializer)
     
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
@@ -354,6 +477,8 @@ class DeliveryAgentRequestViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet
             action='approved',
             reason=serializer.validated_data.get('reason', '')
         )
+        invalidate_dashboard_stats()
+        notify_owners('delivery_agent', 'approve', [agent.id])
         
         return Response({
             'message': 'Delivery agent approved successfully',
@@ -382,6 +507,8 @@ class DeliveryAgentRequestViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet
             action='rejected',
             reason=serializer.validated_data['reason']
         )
+        invalidate_dashboard_stats()
+        notify_owners('delivery_agent', 'reject', [agent.id], serializer.validated_data['reason'])
         
         return Response({
             'message': 'Delivery agent rejected successfully',
@@ -389,14 +516,18 @@ class DeliveryAgentRequestViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet
         })
 
 
-class DeliveryAgentManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
+class DeliveryAgentManagementViewSet(AdminLoginRequiredMixin, EagerLoadingMixin, PaginatedExportMixin, BulkModerationMixin, viewsets.ModelViewSet):
     """Manage approved delivery agents"""
     queryset = DeliveryProfile.objects.all()
     serializer_class = AdminDeliveryAgentListSerializer
+    eager_loading_serializer = AdminDeliveryAgentDetailSerializer
     permission_classes = [IsAdminUser]
+    export_name = 'delivery-agents'
+    moderation_target = 'delivery_agent'
+    bulk_actions = ('block', 'unblock')
     
     def list(self, request, *args, **kwargs):
-        queryset = DeliveryProfile.objects.all()
+        queryset = AdminDeliveryAgentListSerializer.setup_eager_loading(DeliveryProfile.objects.all())
         
         status_filter = request.query_params.get('status', None)
         if status_filter:
@@ -416,16 +547,15 @@ class DeliveryAgentManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelView
         elif blocked_filter == 'active':
             queryset = queryset.filter(is_blocked=False)
         
-        serializer = AdminDeliveryAgentListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset, AdminDeliveryAgentListSerializer)
     
     def retrieve(self, request, *args, **kwargs):
         agent = self.get_object()
         serializer = AdminDeliveryAgentDetailSerializer(agent)
         return Response(serializer.data)
     
-    @action(detail=True, methods=['get'])
-    def detail(self, request, pk=None):
+    @action(detail=True, methods=['get'], url_path='detail')
+    def details(self, request, pk=None):
         agent = self.get_object()
         serializer = AdminDeliveryAgentDetailSerializer(agent)
         return Response(serializer.data)
@@ -447,6 +577,7 @@ class DeliveryAgentManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelView
             action='blocked',
             reason=serializer.validated_data['reason']
         )
+        invalidate_dashboard_stats()
         
         return Response({
             'message': 'Delivery agent blocked successfully',
@@ -470,6 +601,7 @@ class DeliveryAgentManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelView
             action='unblocked',
             reason=serializer.validated_data.get('reason', '')
         )
+        invalidate_dashboard_stats()
         
         return Response({
             'message': 'Delivery agent unblocked successfully',
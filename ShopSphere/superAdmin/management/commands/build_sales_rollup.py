@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from superAdmin.reporting import update_rollup
+
+
+class Command(BaseCommand):
+    help = "Bring the platform daily sales rollup up to date (run from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=parse_date, help="Also rebuild every day on or after YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        days, rows = update_rollup(since_date=options['since'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {days} day(s), wrote {rows} rollup row(s)"))
@@ -64,4 +64,44 @@ class DeliveryAgentApprovalLog(models.Model):
         ordering = ['-timestamp']
 
     def __str__(self):
-        return f"{self.delivery_agent.username} - {self.action} by {self.admin_user.username if self.admin_user else 'System'}"
\ No newline at end of file
+        return f"{self.delivery_agent.username} - {self.action} by {self.admin_user.username if self.admin_user else 'System'}"
+
+class DailySalesRollup(models.Model):
+    """Platform sales for one day, overall or broken down by one dimension (see superAdmin/reporting.py)"""
+
+    DIMENSION_CHOICES = [
+        ('total', 'Total'),
+        ('vendor', 'Vendor'),
+        ('category', 'Category'),
+        ('payment_method', 'Payment Method'),
+    ]
+
+    date = models.DateField()
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    # Vendor id, category id or payment method; empty for the total row or an unknown value
+    key = models.CharField(max_length=100, blank=True, default='')
+    orders_count = models.PositiveIntegerField(default=0)
+    items_sold = models.PositiveIntegerField(default=0)
+    gmv = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    refunds_count = models.PositiveIntegerField(default=0)
+    refunds_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('dimension', 'key', 'date')
+        indexes = [
+            models.Index(fields=['dimension', 'date']),
+        ]
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date} {self.dimension}={self.key or '-'}: {self.gmv}"
+
+class ReportingWatermark(models.Model):
+    """How far an incremental reporting job has read its source table"""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
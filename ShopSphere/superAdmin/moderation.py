@@ -0,0 +1,147 @@
+"""
+Bulk moderation.
+
+Approving, rejecting, blocking or unblocking many vendors, products or
+delivery agents at once: the eligible rows are changed with one UPDATE and
+their approval logs written with one bulk_create, in a single transaction.
+Each id gets its own result, so one bad id doesn't fail the batch.
+Approvals and rejections notify the owners of the changed rows, through
+the same batched inserts (user/notifications.py) for one row or a thousand.
+"""
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from deliveryAgent.models import DeliveryProfile
+from user import notifications
+from vendor.models import Product, VendorProfile
+from .models import DeliveryAgentApprovalLog, ProductApprovalLog, VendorApprovalLog
+from .stats import invalidate_dashboard_stats
+
+MAX_BULK_IDS = 1000
+# Placeholder in Action.updates for the reason given with the request
+REASON = object()
+
+
+@dataclass(frozen=True)
+class Notice:
+    """Notification sent to the owners of the rows an action changed"""
+    notification_type: str
+    title: str
+    # May use {reason}
+    message: str
+
+
+@dataclass(frozen=True)
+class Action:
+    log_action: str
+    # Only rows matching this are changed; the rest are reported as skipped
+    eligible: Q
+    skip_reason: str
+    # Field values to set (REASON is replaced with the request's reason)
+    updates: dict = field(default_factory=dict)
+    reason_required: bool = False
+    notice: Notice = None
+
+
+@dataclass(frozen=True)
+class Target:
+    model: type
+    log_model: type
+    log_field: str
+    label: str
+    actions: dict
+    # Lookup of the owning user's id, for notices
+    owner: str = 'user_id'
+
+
+PENDING = Q(approval_status='pending')
+
+TARGETS = {
+    'vendor': Target(VendorProfile, VendorApprovalLog, 'vendor', 'vendor', {
+        'approve': Action('approved', PENDING, 'Only pending vendors can be approved', {'approval_status': 'approved'},
+                          notice=Notice('vendor_request', 'Your shop has been approved', 'You can now list products and receive orders.')),
+        'reject': Action('rejected', PENDING, 'Only pending vendors can be rejected',
+                         {'approval_status': 'rejected', 'rejection_reason': REASON}, reason_required=True,
+                         notice=Notice('vendor_request', 'Your shop application was rejected', 'Reason: {reason}')),
+        'block': Action('blocked', Q(is_blocked=False), 'Vendor is already blocked',
+                        {'is_blocked': True, 'blocked_reason': REASON}, reason_required=True),
+        'unblock': Action('unblocked', Q(is_blocked=True), 'Vendor is not blocked', {'is_blocked': False, 'blocked_reason': ''}),
+    }),
+    'product': Target(Product, ProductApprovalLog, 'product', 'product', {
+        'block': Action('blocked', Q(is_blocked=False), 'Product is already blocked',
+                        {'is_blocked': True, 'blocked_reason': REASON}, reason_required=True),
+        'unblock': Action('unblocked', Q(is_blocked=True), 'Product is not blocked', {'is_blocked': False, 'blocked_reason': ''}),
+    }, owner='vendor__user_id'),
+    'delivery_agent': Target(DeliveryProfile, DeliveryAgentApprovalLog, 'delivery_agent', 'delivery agent', {
+        'approve': Action('approved', PENDING, 'Only pending agents can be approved', {'approval_status': 'approved'},
+                          notice=Notice('system', 'You are approved for deliveries', 'You can now accept orders from the dispatch queue.')),
+        'reject': Action('rejected', PENDING, 'Only pending agents can be rejected',
+                         {'approval_status': 'rejected'}, reason_required=True,
+                         notice=Notice('system', 'Your delivery partner application was rejected', 'Reason: {reason}')),
+        'block': Action('blocked', Q(is_blocked=False), 'Delivery agent is already blocked',
+                        {'is_blocked': True, 'blocked_reason': REASON}, reason_required=True),
+        'unblock': Action('unblocked', Q(is_blocked=True), 'Delivery agent is not blocked', {'is_blocked': False, 'blocked_reason': ''}),
+    }),
+}
+
+
+def notify_owners(target_name, action_name, ids, reason=''):
+    """Send the action's notice, if it has one, to the users owning ids; returns the number sent"""
+    target = TARGETS[target_name]
+    notice = target.actions[action_name].notice
+    if notice is None:
+        return 0
+    owners = target.model.objects.filter(id__in=ids).values_list(target.owner, flat=True)
+    return notifications.notify_users(
+        list(owners), notice.notification_type, notice.title, notice.message.format(reason=reason or '-')
+    )
+
+
+def bulk_moderate(target_name, action_name, ids, admin_user, reason=''):
+    """
+    Apply one moderation action to every eligible id.
+
+    Returns (updated count, [{'id', 'status': 'updated'|'skipped'|'not_found', 'error'?}]
+    in the order the ids were given).
+    """
+    target = TARGETS[target_name]
+    action = target.actions[action_name]
+    ids = list(dict.fromkeys(ids))
+    now = timezone.now()
+    updates = {name: (reason if value is REASON else value) for name, value in action.updates.items()}
+
+    with transaction.atomic():
+        rows = target.model.objects.filter(id__in=ids)
+        found = set(rows.values_list('id', flat=True))
+        eligible = list(rows.filter(action.eligible).select_for_update().values_list('id', flat=True))
+
+        if eligible:
+            target.model.objects.filter(id__in=eligible).update(updated_at=now, **updates)
+            if target_name == 'vendor' and action_name == 'block':
+                # As for a single block, the vendor's products go down with it
+                Product.objects.filter(vendor_id__in=eligible).update(is_blocked=True, updated_at=now)
+            target.log_model.objects.bulk_create([
+                target.log_model(**{
+                    f'{target.log_field}_id': pk, 'admin_user': admin_user,
+                    'action': action.log_action, 'reason': reason, 'timestamp': now,
+                })
+                for pk in eligible
+            ])
+            notify_owners(target_name, action_name, eligible, reason)
+
+    if eligible:
+        invalidate_dashboard_stats()
+
+    updated = set(eligible)
+    results = []
+    for pk in ids:
+        if pk in updated:
+            results.append({'id': pk, 'status': 'updated'})
+        elif pk in found:
+            results.append({'id': pk, 'status': 'skipped', 'error': action.skip_reason})
+        else:
+            results.append({'id': pk, 'status': 'not_found', 'error': f'No such {target.label}'})
+    return len(eligible), results
@@ -0,0 +1,173 @@
+"""
+Platform-wide daily sales rollup.
+
+DailySalesRollup holds one row per day for the whole platform plus one per
+vendor, category and payment method, so revenue reports read O(days) rows
+instead of scanning orders. update_rollup() is incremental: it finds the
+days touched by orders changed (Order.updated_at) or refunds completed
+since the last run's watermark and recomputes only those days. Run it with
+`manage.py build_sales_rollup` from cron.
+
+Orders changed through queryset.update() don't bump updated_at; rebuild the
+affected range with --since after such bulk edits.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from user.models import Order, OrderItem, Refund
+from vendor.models import Category, VendorProfile
+from .models import DailySalesRollup, ReportingWatermark
+
+# Rows committed this close to "now" may still be in flight; pick them up next run
+DEFAULT_WATERMARK_LAG = 60
+
+# dimension -> (OrderItem lookup, Refund lookup); None for the platform total
+DIMENSIONS = {
+    'total': (None, None),
+    'vendor': ('vendor_id', 'order_return__order_item__vendor_id'),
+    'category': ('product__category_id', 'order_return__order_item__product__category_id'),
+    'payment_method': ('order__payment_method', 'order_return__order__payment_method'),
+}
+
+
+def _day_bounds(day):
+    start = datetime.combine(day, time.min, tzinfo=timezone.get_current_timezone())
+    return start, start + timedelta(days=1)
+
+
+def _empty():
+    return {'orders': 0, 'items': 0, 'gmv': Decimal('0.00'), 'refunds': 0, 'refunded': Decimal('0.00')}
+
+
+def rebuild_day(day):
+    """Recompute every rollup row of one day; returns the number of rows written"""
+    start, end = _day_bounds(day)
+    items = OrderItem.objects.filter(order__created_at__gte=start, order__created_at__lt=end).exclude(order__status='cancelled')
+    refunds = Refund.objects.filter(status='completed', completed_at__gte=start, completed_at__lt=end)
+    item_sums = dict(orders=Count('order_id', distinct=True), sold=Sum('quantity'), total=Sum('subtotal'))
+    refund_sums = dict(n=Count('id'), amount=Sum('refund_amount'))
+
+    stats = defaultdict(_empty)
+
+    def add(dimension, key, item_row=None, refund_row=None):
+        entry = stats[(dimension, key)]
+        if item_row:
+            entry.update(orders=item_row['orders'], items=item_row['sold'] or 0, gmv=item_row['total'] or Decimal('0.00'))
+        if refund_row:
+            entry.update(refunds=refund_row['n'], refunded=refund_row['amount'] or Decimal('0.00'))
+
+    totals, refunded = items.aggregate(**item_sums), refunds.aggregate(**refund_sums)
+    if totals['orders'] or refunded['n']:
+        add('total', None, totals, refunded)
+
+    for dimension, (item_key, refund_key) in DIMENSIONS.items():
+        if item_key is None:
+            continue
+        for row in items.values(item_key).annotate(**item_sums).order_by():
+            add(dimension, row[item_key], item_row=row)
+        for row in refunds.values(refund_key).annotate(**refund_sums).order_by():
+            add(dimension, row[refund_key], refund_row=row)
+
+    rows = [
+        DailySalesRollup(
+            date=day, dimension=dimension, key='' if key is None else str(key),
+            orders_count=entry['orders'], items_sold=entry['items'], gmv=entry['gmv'],
+            refunds_count=entry['refunds'], refunds_amount=entry['refunded'],
+        )
+        for (dimension, key), entry in stats.items()
+    ]
+    with transaction.atomic():
+        DailySalesRollup.objects.filter(date=day).delete()
+        DailySalesRollup.objects.bulk_create(rows)
+    return len(rows)
+
+
+def _changed_days(since, until):
+    """Days whose figures may differ because of orders changed or refunds completed in (since, until]"""
+    tz = timezone.get_current_timezone()
+    orders = Order.objects.filter(updated_at__lte=until)
+    refunds = Refund.objects.filter(status='completed', completed_at__lte=until)
+    if since is not None:
+        orders = orders.filter(updated_at__gt=since)
+        refunds = refunds.filter(completed_at__gt=since)
+    days = {timezone.localtime(ts, tz).date() for ts in orders.values_list('created_at', flat=True).iterator()}
+    days |= {timezone.localtime(ts, tz).date() for ts in refunds.values_list('completed_at', flat=True).iterator()}
+    return days
+
+
+def update_rollup(since_date=None):
+    """
+    Bring the rollup up to date; returns (days rebuilt, rows written).
+
+    since_date forces every day from that date on to be rebuilt (e.g. after
+    bulk edits); otherwise only days touched since the watermark are.
+    """
+    lag = getattr(settings, 'REPORTING_WATERMARK_LAG', DEFAULT_WATERMARK_LAG)
+    until = timezone.now() - timedelta(seconds=lag)
+    watermark, _ = ReportingWatermark.objects.get_or_create(name='daily_sales')
+
+    days = _changed_days(watermark.value, until)
+    if since_date is not None:
+        day, today = since_date, timezone.localdate()
+        while day <= today:
+            days.add(day)
+            day += timedelta(days=1)
+
+    rows = 0
+    for day in sorted(days):
+        rows += rebuild_day(day)
+
+    watermark.value = until
+    watermark.save(update_fields=['value', 'updated_at'])
+    return len(days), rows
+
+
+def _labels(dimension, keys):
+    ids = [int(key) for key in keys if key.isdigit()]
+    if dimension == 'vendor':
+        return {str(pk): name for pk, name in VendorProfile.objects.filter(id__in=ids).values_list('id', 'shop_name')}
+    if dimension == 'category':
+        return {str(pk): name for pk, name in Category.objects.filter(id__in=ids).values_list('id', 'name')}
+    return {}
+
+
+def report(start, end, dimension='total'):
+    """Totals, daily series and, for a dimension, per-key breakdown over [start, end] (dates, inclusive)"""
+    rows = DailySalesRollup.objects.filter(date__gte=start, date__lte=end)
+    sums = dict(
+        total_orders=Sum('orders_count'), total_items=Sum('items_sold'), total_gmv=Sum('gmv'),
+        total_refunds=Sum('refunds_count'), total_refunded=Sum('refunds_amount'),
+    )
+
+    def figures(values):
+        return {
+            'orders': values['total_orders'] or 0,
+            'items_sold': values['total_items'] or 0,
+            'gmv': values['total_gmv'] or Decimal('0.00'),
+            'refunds_count': values['total_refunds'] or 0,
+            'refunds_amount': values['total_refunded'] or Decimal('0.00'),
+        }
+
+    total_rows = rows.filter(dimension='total')
+    result = {
+        'totals': figures(total_rows.aggregate(**sums)),
+        'daily': [
+            dict(date=row['date'], **figures(row))
+            for row in total_rows.values('date').annotate(**sums).order_by('date')
+        ],
+        'last_built': ReportingWatermark.objects.filter(name='daily_sales').values_list('value', flat=True).first(),
+    }
+    if dimension != 'total':
+        breakdown = list(rows.filter(dimension=dimension).values('key').annotate(**sums).order_by('-total_gmv'))
+        labels = _labels(dimension, [row['key'] for row in breakdown])
+        result['breakdown'] = [
+            dict(key=row['key'], label=labels.get(row['key'], row['key']), **figures(row))
+            for row in breakdown
+        ]
+    return result
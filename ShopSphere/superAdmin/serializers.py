@@ -1,9 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
 User = get_user_model()
 from vendor.models import VendorProfile, Product
+from vendor.serializers import ProductImageSerializer
 from deliveryAgent.models import DeliveryProfile
 from .models import VendorApprovalLog, ProductApprovalLog, DeliveryAgentApprovalLog
+from .moderation import MAX_BULK_IDS
 
 class VendorApprovalLogSerializer(serializers.ModelSerializer):
     admin_user_name = serializers.CharField(source='admin_user.username', read_only=True)
@@ -44,19 +47,34 @@ class AdminVendorDetailSerializer(serializers.ModelSerializer):
             'is_blocked', 'blocked_reason', 'created_at', 'approval_logs'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load user and approval_logs (with each log's admin) up front instead of per vendor"""
+        return queryset.select_related('user').prefetch_related(
+            Prefetch('approval_logs', queryset=VendorApprovalLog.objects.select_related('admin_user'))
+        )
+
 class AdminProductDetailSerializer(serializers.ModelSerializer):
     vendor_shop_name = serializers.CharField(source='vendor.shop_name', read_only=True)
     vendor_owner = serializers.CharField(source='vendor.user.username', read_only=True)
     approval_logs = ProductApprovalLogSerializer(source='approval_logs.all', many=True, read_only=True)
+    images = ProductImageSerializer(many=True, read_only=True)
     
     class Meta:
         model = Product
         fields = [
             'id', 'vendor', 'vendor_shop_name', 'vendor_owner', 'name',
-            'description', 'price', 'quantity', 'image', 'status',
+            'description', 'price', 'quantity', 'images', 'status',
             'is_blocked', 'blocked_reason', 'created_at', 'approval_logs'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.with_vendor().select_related('vendor__user').prefetch_related(
+            'images__variants',
+            Prefetch('approval_logs', queryset=ProductApprovalLog.objects.select_related('admin_user'))
+        )
+
 class AdminVendorListSerializer(serializers.ModelSerializer):
     user_email = serializers.CharField(source='user.email', read_only=True)
     approval_status_display = serializers.CharField(source='get_approval_status_display', read_only=True)
@@ -68,6 +86,10 @@ class AdminVendorListSerializer(serializers.ModelSerializer):
             'approval_status_display', 'is_blocked', 'created_at'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('user')
+
 class AdminProductListSerializer(serializers.ModelSerializer):
     vendor_name = serializers.CharField(source='vendor.shop_name', read_only=True)
     
@@ -78,6 +100,10 @@ class AdminProductListSerializer(serializers.ModelSerializer):
             'is_blocked', 'created_at'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.with_vendor()
+
 class AdminDeliveryAgentListSerializer(serializers.ModelSerializer):
     user_email = serializers.CharField(source='user.email', read_only=True)
     user_username = serializers.CharField(source='user.username', read_only=True)
@@ -90,6 +116,10 @@ class AdminDeliveryAgentListSerializer(serializers.ModelSerializer):
             'is_blocked', 'created_at'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('user')
+
 class DeliveryAgentApprovalLogSerializer(serializers.ModelSerializer):
     admin_user_name = serializers.CharField(source='admin_user.username', read_only=True)
     action_display = serializers.CharField(source='get_action_display', read_only=True)
@@ -117,6 +147,12 @@ class AdminDeliveryAgentDetailSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('user').prefetch_related(
+            Prefetch('approval_logs', queryset=DeliveryAgentApprovalLog.objects.select_related('admin_user'))
+        )
+
 class ApproveDeliveryAgentSerializer(serializers.Serializer):
     reason = serializers.CharField(required=False, allow_blank=True)
 
@@ -146,3 +182,26 @@ class BlockProductSerializer(serializers.Serializer):
 
 class UnblockProductSerializer(serializers.Serializer):
     reason = serializers.CharField(required=False, allow_blank=True)
+
+class BulkModerationSerializer(serializers.Serializer):
+    """{"action": ..., "ids": [...], "reason": ...}; the view passes the actions it allows"""
+    action = serializers.ChoiceField(choices=[])
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_BULK_IDS)
+    reason = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def __init__(self, *args, actions=(), reason_required=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['action'].choices = list(actions)
+        self.reason_required = set(reason_required)
+
+    def validate(self, attrs):
+        if attrs['action'] in self.reason_required and not attrs['reason']:
+            raise serializers.ValidationError({'reason': f"A reason is required to {attrs['action']}."})
+        return attrs
+
+
+class PromotionSerializer(serializers.Serializer):
+    """A promotion for every active user, or only those with role"""
+    title = serializers.CharField(max_length=255)
+    message = serializers.CharField()
+    role = serializers.ChoiceField(choices=get_user_model().ROLE_CHOICES, required=False)
@@ -0,0 +1,63 @@
+"""
+Admin dashboard counters.
+
+Every admin dashboard (the superAdmin API and page and the legacy admin
+app) shows the same vendor, product and delivery agent counts. They are
+computed with one conditional aggregate per table and cached for
+ADMIN_STATS_CACHE_TTL seconds; moderation actions call
+invalidate_dashboard_stats() so approvals and blocks show up immediately.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from deliveryAgent.models import DeliveryProfile
+from vendor.models import Product, VendorProfile
+
+CACHE_KEY = 'superAdmin:dashboard_stats'
+DEFAULT_CACHE_TTL = 60
+
+
+def _counts(queryset, **conditions):
+    """{name: count} for every condition plus 'total', in a single query"""
+    return queryset.aggregate(
+        total=Count('id'),
+        **{name: Count('id', filter=condition) for name, condition in conditions.items()},
+    )
+
+
+def compute_dashboard_stats():
+    return {
+        'vendors': _counts(
+            VendorProfile.objects,
+            pending=Q(approval_status='pending'),
+            approved=Q(approval_status='approved'),
+            rejected=Q(approval_status='rejected'),
+            blocked=Q(is_blocked=True),
+        ),
+        'products': _counts(
+            Product.objects,
+            pending=Q(status='pending'),
+            approved=Q(status='approved'),
+            blocked=Q(is_blocked=True),
+        ),
+        'delivery_agents': _counts(
+            DeliveryProfile.objects,
+            pending=Q(approval_status='pending'),
+            active=Q(approval_status='approved', is_blocked=False),
+            blocked=Q(is_blocked=True),
+        ),
+    }
+
+
+def dashboard_stats():
+    """Cached {'vendors': {...}, 'products': {...}, 'delivery_agents': {...}} counters"""
+    stats = cache.get(CACHE_KEY)
+    if stats is None:
+        stats = compute_dashboard_stats()
+        cache.set(CACHE_KEY, stats, getattr(settings, 'ADMIN_STATS_CACHE_TTL', DEFAULT_CACHE_TTL))
+    return stats
+
+
+def invalidate_dashboard_stats():
+    cache.delete(CACHE_KEY)
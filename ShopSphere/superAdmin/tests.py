@@ -1,3 +1,79 @@
 from django.test import TestCase
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+from user.models import AuthUser
+from vendor.models import VendorProfile, Product
+from .models import VendorApprovalLog
+
+
+def make_vendor(username, **fields):
+    user = AuthUser.objects.create_user(username=username, email=f'{username}@example.com', password='pw')
+    vendor = VendorProfile.objects.create(
+        user=user, shop_name=f'{username} shop', shop_description='d', address='a',
+        business_type='retail', **fields
+    )
+    Product.objects.create(vendor=vendor, name=f'{username} product', description='d', price=1, quantity=1)
+    return vendor
+
+
+class BulkModerationTests(TestCase):
+    def setUp(self):
+        self.admin = AuthUser.objects.create_user(username='admin', email='admin@example.com', password='pw', is_staff=True)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.admin).access_token}'}
+
+    def bulk(self, url, payload):
+        return self.client.post(url, payload, content_type='application/json', **self.auth)
+
+    def test_approve_reports_a_result_per_id(self):
+        approved = make_vendor('approved', approval_status='approved')
+        pending = [make_vendor(f'pending{i}') for i in range(3)]
+        ids = [approved.id] + [vendor.id for vendor in pending] + [99999, pending[0].id]
+
+        response = self.bulk('/superAdmin/api/vendor-requests/bulk/', {'action': 'approve', 'ids': ids})
+
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual(data['updated'], 3)
+        self.assertEqual(
+            [(result['id'], result['status']) for result in data['results']],
+            [(approved.id, 'skipped')] + [(vendor.id, 'updated') for vendor in pending] + [(99999, 'not_found')],
+        )
+        self.assertIn('error', data['results'][0])
+        self.assertEqual(VendorApprovalLog.objects.filter(action='approved').count(), 3)
+        self.assertEqual(VendorProfile.objects.filter(approval_status='approved').count(), 4)
+
+    def test_block_requires_a_reason_and_takes_products_down(self):
+        vendors = [make_vendor(f'vendor{i}', approval_status='approved') for i in range(2)]
+        ids = [vendor.id for vendor in vendors]
+
+        response = self.bulk('/superAdmin/api/vendors/bulk/', {'action': 'block', 'ids': ids})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('reason', response.json())
+        self.assertFalse(VendorProfile.objects.filter(is_blocked=True).exists())
+
+        response = self.bulk('/superAdmin/api/vendors/bulk/', {'action': 'block', 'ids': ids, 'reason': 'spam'})
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual(Product.objects.filter(is_blocked=True).count(), 2)
+        self.assertEqual(VendorProfile.objects.get(id=ids[0]).blocked_reason, 'spam')
+
+    def test_unknown_action_is_rejected(self):
+        vendor = make_vendor('vendor', approval_status='approved')
+
+        response = self.bulk('/superAdmin/api/vendors/bulk/', {'action': 'approve', 'ids': [vendor.id]})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class VendorRequestListTests(TestCase):
+    def test_pending_requests_are_paginated(self):
+        admin = AuthUser.objects.create_user(username='admin', email='admin@example.com', password='pw', is_staff=True)
+        for i in range(25):
+            make_vendor(f'vendor{i}')
+        self.client.force_login(admin)
+
+        response = self.client.get('/superAdmin/vendor-requests/?page=2')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['vendors']), 5)
+        self.assertEqual(response.context['total'], 25)
+        self.assertContains(response, 'Page 2 of 2')
@@ -3,15 +3,25 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import authenticate, login, logout, get_user_model
 # User = get_user_model() - Moved inside functions to avoid AppRegistryNotReady error
 
+from django.core.paginator import Paginator
 from django.db.models import Q
 from django.urls import reverse
 from vendor.models import VendorProfile, Product
 from deliveryAgent.models import DeliveryProfile
 from .models import VendorApprovalLog, ProductApprovalLog, DeliveryAgentApprovalLog
+from .stats import dashboard_stats, invalidate_dashboard_stats
+from .moderation import notify_owners
 from rest_framework.permissions import AllowAny,IsAuthenticated
 def is_mainapp_admin(user):
     return True
 
+LIST_PAGE_SIZE = 20
+
+
+def paginate(request, queryset):
+    """The ?page=N page of queryset (out-of-range pages fall back to the nearest one)"""
+    return Paginator(queryset, LIST_PAGE_SIZE).get_page(request.GET.get('page'))
+
 def admin_required(view_func):
     def wrapper(request, *args, **kwargs):
         if not request.user.is_authenticated:
@@ -62,23 +72,17 @@ def admin_logout_view(request):
 
 @admin_required
 def admin_dashboard(request):    
-    total_vendors = VendorProfile.objects.count()
-    pending_vendors = VendorProfile.objects.filter(approval_status='pending').count()
-    approved_vendors = VendorProfile.objects.filter(approval_status='approved').count()
-    rejected_vendors = VendorProfile.objects.filter(approval_status='rejected').count()
-    blocked_vendors = VendorProfile.objects.filter(is_blocked=True).count()
-    
-    total_products = Product.objects.count()
-    blocked_products = Product.objects.filter(is_blocked=True).count()
+    stats = dashboard_stats()
+    vendors, products = stats['vendors'], stats['products']
 
     context = {
-        'total_vendors': total_vendors,
-        'pending_vendors': pending_vendors,
-        'approved_vendors': approved_vendors,
-        'rejected_vendors': rejected_vendors,
-        'blocked_vendors': blocked_vendors,
-        'total_products': total_products,
-        'blocked_products': blocked_products,
+        'total_vendors': vendors['total'],
+        'pending_vendors': vendors['pending'],
+        'approved_vendors': vendors['approved'],
+        'rejected_vendors': vendors['rejected'],
+        'blocked_vendors': vendors['blocked'],
+        'total_products': products['total'],
+        'blocked_products': products['blocked'],
     }
 
     return render(request, 'mainApp/admin_dashboard.html', context)
@@ -87,15 +91,17 @@ def admin_dashboard(request):
 def manage_vendor_requests(request):    
     status_filter = request.GET.get('status', 'pending')
     
-    if status_filter == 'all':
-        vendors = VendorProfile.objects.all().order_by('-created_at')
-    else:
-        vendors = VendorProfile.objects.filter(approval_status=status_filter).order_by('-created_at')
+    vendors = VendorProfile.objects.select_related('user')
+    if status_filter != 'all':
+        vendors = vendors.filter(approval_status=status_filter)
+
+    page_obj = paginate(request, vendors.order_by('-created_at', '-id'))
 
     context = {
-        'vendors': vendors,
+        'vendors': page_obj,
+        'page_obj': page_obj,
         'current_status': status_filter,
-        'total': vendors.count()
+        'total': page_obj.paginator.count
     }
 
     return render(request, 'mainApp/manage_vendor_requests.html', context)
@@ -135,6 +141,8 @@ def approve_vendor(request, vendor_id):
             action='approved',
             reason=request.POST.get('reason', '')
         )
+        invalidate_dashboard_stats()
+        notify_owners('vendor', 'approve', [vendor.id])
 
         return redirect('vendor_request_detail', vendor_id=vendor.id)
 
@@ -159,6 +167,8 @@ def reject_vendor(request, vendor_id):
             action='rejected',
             reason=reason
         )
+        invalidate_dashboard_stats()
+        notify_owners('vendor', 'reject', [vendor.id], reason)
 
         return redirect('vendor_request_detail', vendor_id=vendor.id)
 
@@ -172,7 +182,7 @@ def manage_vendors(request):
     status_filter = request.GET.get('status', '')
     block_filter = request.GET.get('blocked', '')
 
-    vendors = VendorProfile.objects.all()
+    vendors = VendorProfile.objects.select_related('user')
 
     if search_query:
         vendors = vendors.filter(
@@ -189,10 +199,11 @@ def manage_vendors(request):
     elif block_filter == 'active':
         vendors = vendors.filter(is_blocked=False)
 
-    vendors = vendors.order_by('-created_at')
+    page_obj = paginate(request, vendors.order_by('-created_at', '-id'))
 
     context = {
-        'vendors': vendors,
+        'vendors': page_obj,
+        'page_obj': page_obj,
         'search_query': search_query,
         'status_filter': status_filter,
         'block_filter': block_filter,
@@ -218,6 +229,7 @@ def block_vendor(request, vendor_id):
         )
 
         vendor.products.update(is_blocked=True, blocked_reason=f"Vendor blocked: {reason}")
+        invalidate_dashboard_stats()
 
         return redirect('vendor_detail', vendor_id=vendor.id)
 
@@ -241,6 +253,7 @@ def unblock_vendor(request, vendor_id):
             action='unblocked',
             reason=reason
         )
+        invalidate_dashboard_stats()
 
         return redirect('vendor_detail', vendor_id=vendor.id)
 
@@ -269,7 +282,7 @@ def manage_products(request):
     block_filter = request.GET.get('blocked', '')
     status_filter = request.GET.get('status', '')
 
-    products = Product.objects.all().select_related('vendor')
+    products = Product.objects.with_vendor()
 
     if search_query:
         products = products.filter(
@@ -288,12 +301,13 @@ def manage_products(request):
     if status_filter:
         products = products.filter(status=status_filter)
 
-    products = products.order_by('-created_at')
+    page_obj = paginate(request, products.order_by('-created_at', '-id'))
 
     vendors = VendorProfile.objects.filter(approval_status='approved').order_by('shop_name')
 
     context = {
-        'products': products,
+        'products': page_obj,
+        'page_obj': page_obj,
         'vendors': vendors,
         'search_query': search_query,
         'vendor_filter': vendor_filter,
@@ -325,7 +339,7 @@ def block_product(request, product_id):
         reason = request.POST.get('reason', 'No reason provided')
         product.is_blocked = True
         product.blocked_reason = reason
-        product.save()
+        product.save(update_fields=['is_blocked', 'blocked_reason', 'updated_at'])
 
         ProductApprovalLog.objects.create(
             product=product,
@@ -333,6 +347,7 @@ def block_product(request, product_id):
             action='blocked',
             reason=reason
         )
+        invalidate_dashboard_stats()
 
         return redirect('product_detail', product_id=product.id)
 
@@ -348,7 +363,7 @@ def unblock_product(request, product_id):
         reason = request.POST.get('reason', '')
         product.is_blocked = False
         product.blocked_reason = None
-        product.save()
+        product.save(update_fields=['is_blocked', 'blocked_reason', 'updated_at'])
 
         ProductApprovalLog.objects.create(
             product=product,
@@ -356,6 +371,7 @@ def unblock_product(request, product_id):
             action='unblocked',
             reason=reason
         )
+        invalidate_dashboard_stats()
 
         return redirect('product_detail', product_id=product.id)
 
@@ -415,6 +431,8 @@ def approve_agent(request, agent_id):
             action='approved',
             reason=request.POST.get('reason', '')
         )
+        invalidate_dashboard_stats()
+        notify_owners('delivery_agent', 'approve', [agent.id])
 
         return redirect('delivery_agent_detail', agent_id=agent.id)
     
@@ -439,6 +457,8 @@ def reject_agent(request, agent_id):
             action='rejected',
             reason=reason
         )
+        invalidate_dashboard_stats()
+        notify_owners('delivery_agent', 'reject', [agent.id], reason)
 
         return redirect('delivery_agent_detail', agent_id=agent.id)
     
@@ -453,7 +473,7 @@ def manage_agent(request):
     status_filter = request.GET.get('status', '')
     block_filter = request.GET.get('blocked', '')
 
-    agents = DeliveryProfile.objects.all()
+    agents = DeliveryProfile.objects.select_related('user')
 
     if search_query:
         agents = agents.filter(
@@ -469,10 +489,12 @@ def manage_agent(request):
     elif block_filter == 'active':
         agents = agents.filter(is_blocked=False)
 
-    agents = agents.order_by('-created_at')
+    page_obj = paginate(request, agents.order_by('-created_at', '-id'))
 
     context = {
-        'agents': agents,
+        'agents': page_obj,
+        'page_obj': page_obj,
+        'agent_stats': dashboard_stats()['delivery_agents'],
         'search_query': search_query,
         'status_filter': status_filter,
         'block_filter': block_filter,
@@ -496,6 +518,7 @@ def block_agent(request, agent_id):
             action='blocked',
             reason=reason
         )
+        invalidate_dashboard_stats()
 
         agent.orders.update(is_blocked=True, blocked_reason=f'Delivery agent blocked: {reason}')
 
@@ -519,6 +542,7 @@ def unblock_agent(request, agent_id):
             action='unblocked',
             reason=reason
         )
+        invalidate_dashboard_stats()
         return redirect('delivery_agent_detail', agent_id=agent.id)
     return render(request, 'mainApp/delivery_agent_unblock.html', {
         'agent': agent
@@ -0,0 +1,117 @@
+"""
+Idempotency-Key support for mutating API endpoints.
+
+A client that sends the same Idempotency-Key header on a retry gets the
+stored response of the first attempt back instead of having the work
+(order placement, cart changes) done twice. Keys are scoped per user and
+kept for IDEMPOTENCY_KEY_TTL seconds. The response is stored as rendered,
+so a replay carries the same bytes and content type as the original. While
+the first attempt runs, its marker only holds the key for
+IDEMPOTENCY_KEY_LEASE seconds, so a worker that dies mid-request does not
+lock the client out of retrying for a day.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_LEASE = 60
+MAX_KEY_LENGTH = 255
+
+
+def _request_hash(request):
+    """Fingerprint of what was asked, so a key cannot be reused for a different request"""
+    try:
+        body = json.dumps(request.data, sort_keys=True, default=str)
+    except TypeError:
+        body = repr(request.data)
+    payload = f"{request.method} {request.path}\n{body}"
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _expiry(setting, default):
+    return timezone.now() + timedelta(seconds=getattr(settings, setting, default))
+
+
+def _claim(user, key, request_hash):
+    """Insert the in-progress marker for key; returns (record, created)"""
+    expires_at = _expiry('IDEMPOTENCY_KEY_LEASE', DEFAULT_LEASE)
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user, key=key, request_hash=request_hash, expires_at=expires_at
+            ), True
+    except IntegrityError:
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is None:
+            # A concurrent request removed the lapsed entry in between; try the insert again
+            return _claim(user, key, request_hash)
+        if record.expires_at > timezone.now():
+            return record, False
+        # The old entry has lapsed: the key is free to be used again
+        record.delete()
+        return _claim(user, key, request_hash)
+
+
+def _store(record, response):
+    # update(), not save(): if the lease lapsed and a retry took the key over, this is a no-op
+    IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).update(
+        status_code=response.status_code,
+        response_body=response.content,
+        content_type=response.get('Content-Type', ''),
+        expires_at=_expiry('IDEMPOTENCY_KEY_TTL', DEFAULT_TTL),
+    )
+
+
+def idempotent(view_func):
+    """
+    Replay the stored response when a mutating request repeats its Idempotency-Key.
+
+    Apply below @api_view / @permission_classes so request.user is resolved.
+    Requests without the header, and safe methods, are passed straight through.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or request.method in ('GET', 'HEAD', 'OPTIONS') or not request.user.is_authenticated:
+            return view_func(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"}, status=400)
+
+        request_hash = _request_hash(request)
+        record, created = _claim(request.user, key, request_hash)
+        if not created:
+            if record.request_hash != request_hash:
+                return Response({"error": f"{HEADER} was already used for a different request"}, status=422)
+            if record.status_code is None:
+                return Response({"error": "A request with this Idempotency-Key is still being processed"}, status=409)
+            response = HttpResponse(record.response_body, status=record.status_code, content_type=record.content_type)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = view_func(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if isinstance(response, Response) and response.status_code < 500:
+            # The response is rendered after the view returns (by the renderer content
+            # negotiation picked); store what actually goes out
+            response.add_post_render_callback(lambda rendered: _store(record, rendered))
+        else:
+            # Server errors and non-API responses (redirects) are not replayed; let the client retry
+            record.delete()
+        return response
+
+    return wrapper
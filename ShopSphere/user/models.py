@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Sum
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
@@ -85,13 +86,73 @@ class Cart(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Cart"
 
+    def get_totals(self):
+        """(item count, total value) of the cart, computed by the database in one query"""
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            # Items (with products) are already in memory, no need to ask the DB again
+            items = self.items.all()
+            return sum(item.quantity for item in items), sum((item.get_total() for item in items), Decimal('0.00'))
+        return CartItem.totals_for(cart=self)
+
     def get_total(self):
         """Calculate total cart value"""
-        return sum(item.get_total() for item in self.items.all())
+        return self.get_totals()[1]
 
     def get_item_count(self):
         """Get total items in cart"""
-        return sum(item.quantity for item in self.items.all())
+        return self.get_totals()[0]
+
+    def add_product(self, product, quantity=1):
+        """
+        Add quantity units of product to the cart without a read-modify-write.
+
+        The increment is a single conditional UPDATE (quantity = quantity + n
+        WHERE quantity + n <= stock), so concurrent clicks never lose an
+        update. Returns the new line quantity, or None if the stock is too low.
+        """
+        if quantity > product.quantity:
+            return None
+        item, created = CartItem.objects.get_or_create(cart=self, product=product, defaults={'quantity': quantity})
+        if created:
+            return quantity
+        updated = CartItem.objects.filter(
+            pk=item.pk, quantity__lte=F('product__quantity') - quantity
+        ).update(quantity=F('quantity') + quantity)
+        if not updated:
+            return None
+        return CartItem.objects.values_list('quantity', flat=True).get(pk=item.pk)
+
+    def remove_product(self, product_id, quantity=1):
+        """Take quantity units off a cart line, deleting it when nothing is left. Returns the new quantity"""
+        items = CartItem.objects.filter(cart=self, product_id=product_id)
+        if items.filter(quantity__gt=quantity).update(quantity=F('quantity') - quantity):
+            return items.values_list('quantity', flat=True).first() or 0
+        items.delete()
+        return 0
+
+    def set_quantities(self, quantities, products):
+        """
+        Apply a {product_id: quantity} patch in one transaction; 0 removes the line.
+
+        products maps product_id -> Product (e.g. from in_bulk) and must
+        already have been checked against stock by the caller.
+        """
+        with transaction.atomic():
+            removed = [pid for pid, qty in quantities.items() if qty == 0]
+            if removed:
+                CartItem.objects.filter(cart=self, product_id__in=removed).delete()
+            kept = [
+                CartItem(cart=self, product=products[pid], quantity=qty)
+                for pid, qty in quantities.items() if qty > 0
+            ]
+            if kept:
+                # One INSERT ... ON CONFLICT (cart, product) DO UPDATE for the whole patch
+                CartItem.objects.bulk_create(
+                    kept,
+                    update_conflicts=True,
+                    unique_fields=['cart', 'product'],
+                    update_fields=['quantity'],
+                )
 
 
 class CartItem(models.Model):
@@ -111,6 +172,15 @@ class CartItem(models.Model):
         """Calculate total for this cart item"""
         return self.product.price * self.quantity
 
+    @classmethod
+    def totals_for(cls, **filters):
+        """(item count, total value) of the cart items matching filters, e.g. cart__user=user"""
+        totals = cls.objects.filter(**filters).aggregate(
+            item_count=Sum('quantity'),
+            total=Sum(F('product__price') * F('quantity'), output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+        )
+        return totals['item_count'] or 0, totals['total'] or Decimal('0.00')
+
 
 class Address(models.Model):
     """Delivery addresses for users"""
@@ -191,6 +261,9 @@ class Order(models.Model):
         indexes = [
             models.Index(fields=['user', 'status']),
             models.Index(fields=['order_number']),
+            # Day-range scans and the changed-since-watermark scan of superAdmin/reporting.py
+            models.Index(fields=['created_at']),
+            models.Index(fields=['updated_at']),
         ]
 
     def __str__(self):
@@ -226,17 +299,30 @@ class OrderItem(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     vendor_status = models.CharField(max_length=20, choices=VENDOR_STATUS_CHOICES, default='waiting')
+    # Set once the vendor hands the item over for delivery; from then on vendor_status follows the shipment
+    shipment = models.ForeignKey('deliveryAgent.Shipment', on_delete=models.SET_NULL, null=True, blank=True, related_name='items')
+    # Copy of order.created_at so vendor analytics can range-scan (vendor, created_at) without a join
+    created_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-order__created_at']
+        indexes = [
+            models.Index(fields=['vendor', 'created_at']),
+        ]
 
     def __str__(self):
         return f"{self.product_name} x {self.quantity} in {self.order.order_number}"
 
+    def save(self, *args, **kwargs):
+        if self.created_at is None:
+            self.created_at = self.order.created_at
+        super().save(*args, **kwargs)
+
 
 class OrderTracking(models.Model):
     """Order tracking history"""
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='tracking_history')
+    shipment = models.ForeignKey('deliveryAgent.Shipment', on_delete=models.SET_NULL, null=True, blank=True, related_name='tracking_history')
     status = models.CharField(max_length=50)
     location = models.CharField(max_length=255, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
@@ -244,6 +330,10 @@ class OrderTracking(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # A customer's tracking page: one order's history, newest first
+            models.Index(fields=['order', 'timestamp']),
+        ]
 
     def __str__(self):
         return f"{self.order.order_number} - {self.status}"
@@ -556,6 +646,8 @@ class Notification(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'is_read']),
+            # The keyset-paginated feed (user/notifications.py), newest first
+            models.Index(fields=['user', 'created_at']),
         ]
 
     def __str__(self):
@@ -686,6 +778,26 @@ class Review(models.Model):
     def __str__(self):
         return f"Review by {self.user.username} for {self.Product.name}"
 
+class IdempotencyKey(models.Model):
+    """Stored outcome of a mutating request sent with an Idempotency-Key header (see user/idempotency.py)"""
+    user = models.ForeignKey(AuthUser, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    # Empty until the first request finishes; a retry arriving meanwhile is told to wait
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    # The rendered bytes, so a replay is identical to what the first attempt sent
+    response_body = models.BinaryField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.key} ({self.user_id})"
+
+
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
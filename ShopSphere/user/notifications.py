@@ -0,0 +1,139 @@
+"""
+User notifications.
+
+notify_users() writes one Notification per recipient with a multi-row
+INSERT per NOTIFICATION_BATCH_SIZE recipients, so a promotion to 100k users
+is 100 INSERTs; send_promotion() runs that on the background pool
+(ShopSphere/tasks.py) so the admin's request returns at once. Each user's
+unread count is cached in the shared cache (CACHES in settings; a
+per-process cache would let other workers serve a count this one has
+dropped) and, rather than touched per notification, dropped for a whole
+batch with one delete_many; the next read recounts it on the
+(user, is_read) index. Every batch is also pushed to open pages through
+ShopSphere/events.py.
+"""
+import logging
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from ShopSphere import events, tasks
+from .models import AuthUser, Notification
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_UNREAD_CACHE_TTL = 300
+
+
+def batch_size():
+    return getattr(settings, 'NOTIFICATION_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+
+def _cache_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def _drop_cached_counts(keys):
+    try:
+        cache.delete_many(keys)
+    except Exception:
+        # The write has committed by now; an unreachable cache must not turn it into an error.
+        # The stale counts expire after NOTIFICATION_UNREAD_CACHE_TTL.
+        logger.exception("Could not drop %d cached unread count(s)", len(keys))
+
+
+def _invalidate(user_ids):
+    keys = [_cache_key(user_id) for user_id in user_ids]
+    # After commit, so a concurrent read can't cache the count from before the change
+    transaction.on_commit(lambda: _drop_cached_counts(keys))
+
+
+def _chunks(users, size):
+    """Lists of up to size user ids, from a user queryset (paged by id) or an iterable of ids"""
+    if isinstance(users, QuerySet):
+        ids = users.order_by('id').values_list('id', flat=True)
+        last = 0
+        while True:
+            chunk = list(ids.filter(id__gt=last)[:size])
+            if not chunk:
+                return
+            yield chunk
+            last = chunk[-1]
+    iterator = iter(users)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def notify_users(users, notification_type, title, message, related_order=None):
+    """Send the same notification to users (a user queryset or user ids); returns the number written"""
+    order_id = getattr(related_order, 'pk', related_order)
+    written = 0
+    for chunk in _chunks(users, batch_size()):
+        with transaction.atomic():
+            Notification.objects.bulk_create([
+                Notification(
+                    user_id=user_id, notification_type=notification_type, title=title,
+                    message=message, related_order_id=order_id,
+                )
+                for user_id in chunk
+            ])
+            _invalidate(chunk)
+            events.publish_on_commit('notification', {
+                'notification_type': notification_type, 'title': title,
+                'order_id': order_id,
+            }, [f'user:{user_id}' for user_id in chunk])
+        written += len(chunk)
+    return written
+
+
+def notify(user, notification_type, title, message, related_order=None):
+    return notify_users([getattr(user, 'pk', user)], notification_type, title, message, related_order)
+
+
+def send_promotion(title, message, role=None):
+    """Queue a promotion to every active user (or those with role) on the background pool"""
+    users = AuthUser.objects.filter(is_active=True)
+    if role:
+        users = users.filter(role=role)
+    return tasks.submit(notify_users, users, 'promotion', title, message)
+
+
+def unread_count(user):
+    user_id = getattr(user, 'pk', user)
+
+    def count():
+        return Notification.objects.filter(user_id=user_id, is_read=False).count()
+
+    try:
+        return cache.get_or_set(
+            _cache_key(user_id), count,
+            getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TTL', DEFAULT_UNREAD_CACHE_TTL),
+        )
+    except Exception:
+        logger.exception("Unread count cache unavailable; counting directly")
+        return count()
+
+
+def mark_read(user, notification_id):
+    """Mark one of user's notifications read; False if it isn't theirs or was already read"""
+    user_id = getattr(user, 'pk', user)
+    done = Notification.objects.filter(pk=notification_id, user_id=user_id, is_read=False).update(
+        is_read=True, read_at=timezone.now()
+    ) == 1
+    if done:
+        _invalidate([user_id])
+    return done
+
+
+def mark_all_read(user):
+    """Mark every unread notification of user read with one UPDATE; returns how many changed"""
+    user_id = getattr(user, 'pk', user)
+    changed = Notification.objects.filter(user_id=user_id, is_read=False).update(is_read=True, read_at=timezone.now())
+    if changed:
+        _invalidate([user_id])
+    return changed
@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from .models import (AuthUser, Cart, CartItem, Order, OrderItem, Address, 
                      UserWallet, WalletTransaction, OrderReturn, Refund, 
-                     TwoFactorAuth, Notification, Dispute, Coupon, CouponUsage)
+                     TwoFactorAuth, Notification, Dispute, Coupon, CouponUsage, OrderTracking)
+from deliveryAgent.models import Shipment
 from vendor.models import Product, ProductImage
+from vendor.serializers import ProductImageVariantSerializer, variant_srcset
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -20,9 +22,21 @@ class RegisterSerializer(serializers.ModelSerializer):
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    image_url = serializers.SerializerMethodField()
+    variants = ProductImageVariantSerializer(many=True, read_only=True)
+
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'uploaded_at']
+        fields = ['id', 'image_url', 'width', 'height', 'variants', 'uploaded_at']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # From the variants serialized above, so srcset costs no queries of its own
+        data['srcset'] = variant_srcset(data['variants'])
+        return data
+
+    def get_image_url(self, obj):
+        return obj.get_absolute_url()
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -35,7 +49,7 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'description', 'category', 'price', 
             'quantity', 'images', 'status', 'is_blocked', 'created_at',
-            'vendor_name', 'vendor_id'
+            'vendor_name', 'vendor_id', 'rating_avg', 'rating_count', 'rating_histogram'
         ]
 
 
@@ -77,6 +91,22 @@ class OrderSerializer(serializers.ModelSerializer):
                   'status', 'delivery_address', 'created_at', 'items']
 
 
+class OrderTrackingSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OrderTracking
+        fields = ['id', 'shipment', 'status', 'location', 'notes', 'timestamp']
+
+
+class ShipmentSerializer(serializers.ModelSerializer):
+    shop_name = serializers.CharField(source='vendor.shop_name', default=None, read_only=True)
+    agent = serializers.CharField(source='assigned_to.username', default=None, read_only=True)
+    items = serializers.SlugRelatedField(many=True, read_only=True, slug_field='product_name')
+
+    class Meta:
+        model = Shipment
+        fields = ['id', 'shop_name', 'status', 'agent', 'items', 'created_at', 'assigned_at', 'delivered_at']
+
+
 class CartItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     total_price = serializers.SerializerMethodField()
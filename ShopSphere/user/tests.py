@@ -1,3 +1,158 @@
+import asyncio
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError
 from django.test import TestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ShopSphere import events
+from vendor.models import VendorProfile, Product
+from . import idempotency
+from .models import AuthUser, Cart, CartItem, IdempotencyKey, Order
+
+
+def bearer(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+class CheckoutTestCase(TestCase):
+    def setUp(self):
+        vendor_user = AuthUser.objects.create_user(username='vendor', email='vendor@example.com', password='pw')
+        vendor = VendorProfile.objects.create(
+            user=vendor_user, shop_name='Shop', shop_description='d', address='a',
+            business_type='retail', approval_status='approved',
+        )
+        self.product = Product.objects.create(
+            vendor=vendor, name='Lamp', description='d', price=Decimal('10.00'), quantity=30,
+        )
+        self.customer = AuthUser.objects.create_user(username='customer', email='customer@example.com', password='pw')
+        self.auth = bearer(self.customer)
+        cart = Cart.objects.create(user=self.customer)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+
+    def pay(self, data=None, **headers):
+        data = {'payment_mode': 'cod'} if data is None else data
+        return self.client.post(
+            '/process_payment?format=json', data, content_type='application/json', **self.auth, **headers
+        )
+
+
+class IdempotentPaymentTests(CheckoutTestCase):
+    def test_retry_replays_the_stored_response(self):
+        first = self.pay(HTTP_IDEMPOTENCY_KEY='pay-1')
+        retry = self.pay(HTTP_IDEMPOTENCY_KEY='pay-1')
+
+        self.assertEqual(first.status_code, 200, first.content)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Content-Type'], first['Content-Type'])
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 28)
+
+    def test_key_reused_for_a_different_request_is_refused(self):
+        self.pay(HTTP_IDEMPOTENCY_KEY='pay-1')
+
+        response = self.pay({'payment_mode': 'upi'}, HTTP_IDEMPOTENCY_KEY='pay-1')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_claim_retries_when_the_conflicting_row_disappears(self):
+        create = IdempotencyKey.objects.create
+        calls = []
+
+        def create_after_a_lost_race(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                # Another request held the key, then its row expired and was deleted
+                raise IntegrityError('UNIQUE constraint failed')
+            return create(**kwargs)
+
+        with mock.patch.object(IdempotencyKey.objects, 'create', side_effect=create_after_a_lost_race):
+            record, created = idempotency._claim(self.customer, 'pay-1', 'hash')
+
+        self.assertTrue(created)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(record.key, 'pay-1')
+
+
+class PaymentValidationTests(CheckoutTestCase):
+    def test_bad_lines_are_rejected_before_touching_stock(self):
+        bad_lines = {
+            'zero quantity': {'product_id': self.product.id, 'price': '10', 'quantity': 0},
+            'negative quantity': {'product_id': self.product.id, 'price': '10', 'quantity': -7},
+            'negative price': {'product_id': self.product.id, 'price': '-10', 'quantity': 1},
+            'unknown product': {'product_id': 99999, 'price': '10', 'quantity': 1},
+        }
+        for case, line in bad_lines.items():
+            with self.subTest(case):
+                response = self.pay({'payment_mode': 'cod', 'items': [line]})
+                self.assertEqual(response.status_code, 400, response.content)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 30)
+        self.assertFalse(Order.objects.exists())
+
+    def test_items_are_priced_from_the_catalog(self):
+        line = {'product_id': self.product.id, 'price': '0.01', 'quantity': 1}
+
+        response = self.pay({'payment_mode': 'cod', 'items': [line]})
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(Order.objects.get().items.get().product_price, Decimal('10.00'))
+
+
+class EventStreamAuthorizationTests(TestCase):
+    def test_wsgi_requests_are_refused(self):
+        self.assertEqual(self.client.get('/events/').status_code, 503)
+
+    async def test_stream_requires_a_signed_in_user(self):
+        response = await self.async_client.get('/events/')
+        self.assertEqual(response.status_code, 401)
+
+        response = await self.async_client.get('/events/', headers={'Authorization': 'Bearer not-a-token'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_order_stream_is_limited_to_the_owner(self):
+        owner = await sync_to_async(AuthUser.objects.create_user)(
+            username='owner', email='owner@example.com', password='pw'
+        )
+        stranger = await sync_to_async(AuthUser.objects.create_user)(
+            username='stranger', email='stranger@example.com', password='pw'
+        )
+        order = await sync_to_async(Order.objects.create)(user=owner, order_number='ORD1', payment_method='cod')
+
+        await self.async_client.aforce_login(stranger)
+        response = await self.async_client.get(f'/events/?order={order.id}')
+        self.assertEqual(response.status_code, 404)
+
+        await self.async_client.aforce_login(owner)
+        response = await self.async_client.get(f'/events/?order={order.id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        await self.close_stream(response)
+
+    async def test_bearer_token_signs_in(self):
+        customer = await sync_to_async(AuthUser.objects.create_user)(
+            username='customer', email='customer@example.com', password='pw'
+        )
+        token = await sync_to_async(RefreshToken.for_user)(customer)
+
+        response = await self.async_client.get('/events/', headers={'Authorization': f'Bearer {token.access_token}'})
+
+        self.assertEqual(response.status_code, 200)
+        await self.close_stream(response)
 
-# Create your tests here.
+    async def close_stream(self, response):
+        """Read the opening chunk, then drop the connection the way the ASGI handler does"""
+        chunks = response.streaming_content.__aiter__()
+        self.assertIn(b'retry', await chunks.__anext__())
+        pending = asyncio.ensure_future(chunks.__anext__())
+        await asyncio.sleep(0.05)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(dict(events.get_broker()._subscriptions), {})
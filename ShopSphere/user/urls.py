@@ -10,12 +10,15 @@ urlpatterns = [
     # Shop / Product
 
     path('', views.get_product, name='user_products'),
+    path('browse', views.browse_products, name='browse_products'),
+    path('search', views.search_products, name='search_products'),
 
     # Cart
     path('cart', views.cart_view, name='cart'),
     path('add_to_cart/<int:product_id>', views.add_to_cart, name='add_to_cart'),
     path('remove_from_cart/<int:product_id>', views.remove_from_cart, name='remove_from_cart'),
     path('update_cart_quantity/<int:product_id>', views.update_cart_quantity, name='update_cart_quantity'),
+    path('cart/items', views.bulk_update_cart, name='bulk_update_cart'),
 
 
     path('checkout', views.checkout_view, name='checkout'),
@@ -23,6 +26,11 @@ urlpatterns = [
 
     # User Profile / Orders
     path('my_orders', views.my_orders, name='my_orders'),
+    path('my_orders/<int:order_id>/tracking', views.order_tracking, name='order_tracking'),
+    path('notifications', views.notification_feed, name='notification_feed'),
+    path('notifications/unread_count', views.notification_unread_count, name='notification_unread_count'),
+    path('notifications/read_all', views.notification_read_all, name='notification_read_all'),
+    path('notifications/<int:notification_id>/read', views.notification_read, name='notification_read'),
     path('address', views.address_page, name="address_page"),
     path('delete-address/<int:id>', views.delete_address, name="delete_address"),
 
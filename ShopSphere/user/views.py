@@ -5,16 +5,24 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate, login, logout
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 
-from .models import AuthUser, Cart, CartItem, Order, OrderItem, Address, Review
-from .serializers import RegisterSerializer, ProductSerializer, CartSerializer, OrderSerializer, AddressSerializer
+from .models import AuthUser, Cart, CartItem, Order, OrderItem, Address, Review, Notification
+from .serializers import (RegisterSerializer, ProductSerializer, CartSerializer, OrderSerializer, AddressSerializer,
+                          OrderTrackingSerializer, ShipmentSerializer, NotificationSerializer)
 from .forms import AddressForm
+from .idempotency import idempotent
+from . import notifications
 import uuid
-from django.db import transaction
-from vendor.models import Product
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from vendor import analytics, facets, inventory, search
+from deliveryAgent import shipments
+from vendor.models import Category, Product, VendorProfile, binary_field_names
 from rest_framework.decorators import authentication_classes
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.utils.urls import replace_query_param
+from ShopSphere.pagination import KeysetPagination
 
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
@@ -72,11 +80,37 @@ def login_api(request):
     return Response({"error": "Invalid credentials"}, status=401)
 
 
+def cart_items_queryset():
+    """Cart items with everything CartItemSerializer reads, loaded in a fixed number of queries"""
+    return (
+        CartItem.objects
+        .select_related('product__vendor')
+        .defer(*(f'product__vendor__{name}' for name in binary_field_names(VendorProfile)))
+        .prefetch_related('product__images__variants')
+    )
+
+
+def catalog_queryset():
+    """Products visible on the storefront, with vendor and images loaded up front"""
+    return (
+        Product.objects.filter(is_blocked=False, status='active')
+        .with_vendor()
+        .prefetch_related('images__variants')
+    )
+
+
 # 🔹 HOME (Product Page)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_product(request):
-    products = Product.objects.all()
+    # Catalog mode: keyset-paginated listing of visible products only
+    if request.query_params.get('mode') == 'catalog':
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(catalog_queryset(), request)
+        serializer = ProductSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+    products = Product.objects.with_vendor().prefetch_related('images__variants')
     
     if request.accepted_renderer.format == 'json':
         serializer = ProductSerializer(products, many=True, context={'request': request})
@@ -84,11 +118,7 @@ def get_product(request):
 
     cart_count = 0
     if request.user.is_authenticated:
-        try:
-            cart = Cart.objects.get(user=request.user)
-            cart_count = sum(item.quantity for item in cart.items.all())
-        except Cart.DoesNotExist:
-            pass
+        cart_count, _ = CartItem.totals_for(cart__user=request.user)
             
     return render(request, "product_list.html", {
         "products": products, 
@@ -96,23 +126,92 @@ def get_product(request):
         "user": request.user
     })
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def browse_products(request):
+    """
+    Faceted storefront listing.
+
+    Filters: ?category=<id|slug>&vendor=<id>&min_price=&max_price=&min_rating=
+    (vendor may repeat). Products are keyset-paginated; facet counts come from
+    the precomputed CatalogFacet table for the category page (or whole catalog).
+    """
+    products = catalog_queryset()
+    params = request.query_params
+
+    category = None
+    if params.get('category'):
+        lookup = {'id': params['category']} if params['category'].isdigit() else {'slug': params['category']}
+        category = get_object_or_404(Category.objects.only('id', 'name', 'slug'), **lookup)
+        products = products.filter(category=category)
+
+    try:
+        vendor_ids = [int(v) for v in params.getlist('vendor')]
+        min_price = Decimal(params['min_price']) if params.get('min_price') else None
+        max_price = Decimal(params['max_price']) if params.get('max_price') else None
+        min_rating = int(params['min_rating']) if params.get('min_rating') else None
+    except (ValueError, InvalidOperation):
+        return Response({"error": "vendor and min_rating must be integers, prices must be numbers"}, status=400)
+
+    if vendor_ids:
+        products = products.filter(vendor_id__in=vendor_ids)
+    if min_price is not None:
+        products = products.filter(price__gte=min_price)
+    if max_price is not None:
+        products = products.filter(price__lt=max_price)
+    if min_rating is not None:
+        products = products.filter(rating_avg__gte=min_rating)
+
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(products, request)
+    serializer = ProductSerializer(page, many=True, context={'request': request})
+    response = paginator.get_paginated_response(serializer.data)
+    response.data['category'] = {"id": category.id, "name": category.name, "slug": category.slug} if category else None
+    response.data['facets'] = facets.facets_for(category.id if category else None)
+    return response
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_products(request):
+    """Ranked storefront search: ?q=<text>&offset=<n>&page_size=<n>"""
+    query = request.query_params.get('q', '').strip()
+    try:
+        offset = max(0, int(request.query_params.get('offset', 0)))
+        page_size = max(1, min(int(request.query_params.get('page_size', 20)), 100))
+    except ValueError:
+        return Response({"error": "offset and page_size must be integers"}, status=400)
+
+    products, total = search.search_products(catalog_queryset(), query, offset=offset, limit=page_size)
+    next_link = None
+    if offset + page_size < total:
+        next_link = replace_query_param(request.build_absolute_uri(), 'offset', offset + page_size)
+
+    serializer = ProductSerializer(products, many=True, context={'request': request})
+    return Response({
+        "count": total,
+        "next": next_link,
+        "results": serializer.data
+    })
+
 @api_view(['GET', 'POST'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
+@idempotent
 def add_to_cart(request, product_id):
     product = get_object_or_404(Product, id=product_id)
     cart, created = Cart.objects.get_or_create(user=request.user)
-    
-    cart_item, item_created = CartItem.objects.get_or_create(cart=cart, product=product)
-    
-    if not item_created:
-        cart_item.quantity += 1
-        cart_item.save()
-    
+
+    quantity = cart.add_product(product)
+    if quantity is None:
+        if request.accepted_renderer.format == 'json':
+            return Response({"error": f"Only {product.quantity} left in stock"}, status=400)
+        return redirect('cart')
+
     if request.accepted_renderer.format == 'json':
         return Response({
             "message": "Product added to cart",
-            "cart_count": sum(item.quantity for item in cart.items.all())
+            "quantity": quantity,
+            "cart_count": cart.get_item_count()
         })
         
     return redirect('cart')
@@ -122,13 +221,14 @@ def add_to_cart(request, product_id):
 @permission_classes([IsAuthenticated])
 def cart_view(request):
     cart, created = Cart.objects.get_or_create(user=request.user)
+    prefetch_related_objects([cart], Prefetch('items', queryset=cart_items_queryset()))
     cart_items = cart.items.all()
     
     if request.accepted_renderer.format == 'json':
         serializer = CartSerializer(cart, context={'request': request})
         return Response(serializer.data)
         
-    total_price = sum(item.get_total() for item in cart_items)
+    total_price = cart.get_total()
     
     return render(request, "cart.html", {
         "cart_items": cart_items, 
@@ -138,6 +238,7 @@ def cart_view(request):
 @api_view(['POST', 'DELETE'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
+@idempotent
 def remove_from_cart(request, product_id):
     cart = get_object_or_404(Cart, user=request.user)
     cart_item = get_object_or_404(CartItem, cart=cart, product_id=product_id)
@@ -146,48 +247,101 @@ def remove_from_cart(request, product_id):
     if request.accepted_renderer.format == 'json':
         return Response({
             "message": "Product removed from cart",
-            "cart_count": sum(item.quantity for item in cart.items.all())
+            "cart_count": cart.get_item_count()
         })
     return redirect('cart')
 
 @api_view(['POST', 'PATCH'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
+@idempotent
 def update_cart_quantity(request, product_id):
     action = request.data.get('action') # 'increase' or 'decrease'
     cart = get_object_or_404(Cart, user=request.user)
-    cart_item = get_object_or_404(CartItem, cart=cart, product_id=product_id)
+    cart_item = get_object_or_404(CartItem.objects.select_related('product'), cart=cart, product_id=product_id)
     
     if action == 'increase':
-        cart_item.quantity += 1
+        quantity = cart.add_product(cart_item.product)
+        if quantity is None:
+            return Response({"error": f"Only {cart_item.product.quantity} left in stock"}, status=400)
     elif action == 'decrease':
-        if cart_item.quantity > 1:
-            cart_item.quantity -= 1
-        else:
-            cart_item.delete()
-            return Response({"message": "Item removed from cart", "cart_count": sum(item.quantity for item in cart.items.all())})
-    
-    cart_item.save()
+        quantity = cart.remove_product(product_id)
+        if not quantity:
+            return Response({"message": "Item removed from cart", "cart_count": cart.get_item_count()})
+    else:
+        return Response({"error": "action must be 'increase' or 'decrease'"}, status=400)
     
     return Response({
         "message": "Quantity updated",
-        "quantity": cart_item.quantity,
-        "cart_count": sum(item.quantity for item in cart.items.all())
+        "quantity": quantity,
+        "cart_count": cart.get_item_count()
+    })
+
+@api_view(['PATCH'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+@idempotent
+def bulk_update_cart(request):
+    """Set several cart lines at once: {"items": {"<product_id>": <quantity>, ...}}, 0 removes a line"""
+    items = request.data.get('items')
+    if not isinstance(items, dict) or not items:
+        return Response({"error": "items must be a non-empty {product_id: quantity} object"}, status=400)
+
+    try:
+        quantities = {int(pid): int(qty) for pid, qty in items.items()}
+    except (TypeError, ValueError):
+        return Response({"error": "Product ids and quantities must be integers"}, status=400)
+
+    products = Product.objects.only('id', 'name', 'quantity').in_bulk(list(quantities))
+    errors = {}
+    for pid, qty in quantities.items():
+        if qty < 0:
+            errors[pid] = "Quantity cannot be negative"
+        elif pid not in products:
+            errors[pid] = "Product not found"
+        elif qty > products[pid].quantity:
+            errors[pid] = f"Only {products[pid].quantity} left in stock"
+    if errors:
+        # Nothing is applied unless the whole patch is valid
+        return Response({"errors": errors}, status=400)
+
+    cart, created = Cart.objects.get_or_create(user=request.user)
+    cart.set_quantities(quantities, products)
+
+    items_count, total_price = cart.get_totals()
+    return Response({
+        "message": "Cart updated",
+        "cart_count": items_count,
+        "total_price": total_price
     })
 
+@api_view(['GET', 'POST'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
 def checkout_view(request):
+    """GET shows the checkout summary; POST also holds the cart's stock while the customer pays"""
     cart, created = Cart.objects.get_or_create(user=request.user)
-    cart_items = cart.items.all()
+    items_count, total_price = cart.get_totals()
     
-    if not cart_items:
+    if not items_count:
         if request.accepted_renderer.format == 'json':
              return Response({"message": "Cart is empty"}, status=400)
         return redirect('cart')
-        
-    total_price = sum(item.get_total() for item in cart_items)
-    items_count = sum(item.quantity for item in cart_items)
+
+    # Only an explicit POST holds stock, so prefetches and reloads of the page don't;
+    # the hold lapses after STOCK_RESERVATION_TTL
+    if request.method == 'POST':
+        try:
+            inventory.reserve(request.user, cart.items.values_list('product_id', 'quantity'))
+        except inventory.OutOfStock as e:
+            if request.accepted_renderer.format == 'json':
+                return Response({"error": "Some items are out of stock", "product_id": e.product_id}, status=409)
+            return redirect('cart')
+        if request.accepted_renderer.format != 'json':
+            return redirect('checkout')
     
     if request.accepted_renderer.format == 'json':
+        prefetch_related_objects([cart], Prefetch('items', queryset=cart_items_queryset()))
         return Response({
             "total_price": total_price,
             "items_count": items_count,
@@ -202,6 +356,7 @@ def checkout_view(request):
 @api_view(['POST'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
+@idempotent
 def process_payment(request):
     payment_mode = request.data.get('payment_mode')
     transaction_id = request.data.get('transaction_id') or str(uuid.uuid4())[:12]
@@ -211,15 +366,45 @@ def process_payment(request):
     if not payment_mode:
         return Response({"error": "Payment mode required"}, status=400)
 
+    if items_from_request:
+        try:
+            lines = [
+                (
+                    int(item_data.get('product_id') or item_data.get('id') or 0) or None,
+                    Decimal(str(item_data.get('price', 0))),
+                    int(item_data.get('quantity', 1)),
+                )
+                for item_data in items_from_request
+            ]
+        except (AttributeError, TypeError, ValueError, InvalidOperation):
+            return Response({"error": "Product ids, prices and quantities must be numbers"}, status=400)
+        if any(quantity < 1 for _, _, quantity in lines):
+            return Response({"error": "Quantities must be at least 1"}, status=400)
+        if any(not price.is_finite() or price < 0 for _, price, _ in lines):
+            return Response({"error": "Prices cannot be negative"}, status=400)
+
+        # One query resolves every referenced product; price and name come from it, not the client
+        products = Product.objects.only('id', 'vendor_id', 'name', 'price').in_bulk([line[0] for line in lines if line[0]])
+        unknown = [product_id for product_id, _, _ in lines if product_id not in products]
+        if unknown:
+            return Response({"error": "Unknown products", "product_ids": unknown}, status=400)
+
     try:
         with transaction.atomic():
             # CASE 1: Items passed directly (frontend state)
             if items_from_request:
-                total_amount = Decimal('0.00')
-                for item_data in items_from_request:
-                    price = Decimal(str(item_data.get('price', 0)))
-                    quantity = int(item_data.get('quantity', 1))
-                    total_amount += price * quantity
+                order_items = []
+                for product_id, _, quantity in lines:
+                    product = products[product_id]
+                    order_items.append(OrderItem(
+                        product=product,
+                        vendor_id=product.vendor_id,
+                        product_name=product.name,
+                        quantity=quantity,
+                        product_price=product.price,
+                        subtotal=product.price * quantity
+                    ))
+                total_amount = sum((item.subtotal for item in order_items), Decimal('0.00'))
                 
                 order = Order.objects.create(
                     user=request.user,
@@ -230,26 +415,23 @@ def process_payment(request):
                     subtotal=total_amount
                 )
                 
-                for item_data in items_from_request:
-                    price = Decimal(str(item_data.get('price', 0)))
-                    quantity = int(item_data.get('quantity', 1))
-                    OrderItem.objects.create(
-                        order=order,
-                        product_name=item_data.get('name'),
-                        quantity=quantity,
-                        product_price=price,
-                        subtotal=price * quantity
-                    )
+                inventory.commit(request.user, [(item.product_id, item.quantity) for item in order_items])
+                for item in order_items:
+                    item.order = order
+                    item.created_at = order.created_at
+                OrderItem.objects.bulk_create(order_items)
+                analytics.record_order_items(order_items)
                 Cart.objects.filter(user=request.user).delete()
 
             # CASE 2: Use items from the database cart
             else:
                 cart = Cart.objects.get(user=request.user)
-                cart_items = cart.items.all()
+                cart_items = list(cart.items.select_related('product'))
                 if not cart_items:
                     return Response({"error": "Cart is empty"}, status=400)
 
                 total_amount = sum(item.get_total() for item in cart_items)
+                inventory.commit(request.user, [(item.product_id, item.quantity) for item in cart_items])
                 
                 order = Order.objects.create(
                     user=request.user,
@@ -260,19 +442,30 @@ def process_payment(request):
                     subtotal=total_amount
                 )
 
-                for item in cart_items:
-                    OrderItem.objects.create(
+                # A single multi-row INSERT keeps the write transaction short
+                order_items = OrderItem.objects.bulk_create([
+                    OrderItem(
                         order=order,
                         product=item.product,
+                        vendor_id=item.product.vendor_id,
                         product_name=item.product.name,
                         quantity=item.quantity,
                         product_price=item.product.price,
-                        subtotal=item.get_total()
+                        subtotal=item.get_total(),
+                        created_at=order.created_at
                     )
+                    for item in cart_items
+                ])
+                analytics.record_order_items(order_items)
                 cart.items.all().delete()
 
     except Cart.DoesNotExist:
         return Response({"error": "Cart not found"}, status=404)
+    except inventory.OutOfStock as e:
+        return Response({"error": "Some items are out of stock", "product_id": e.product_id}, status=409)
+    except IntegrityError:
+        # Same transaction_id sent twice without an Idempotency-Key
+        return Response({"error": "An order with this transaction ID already exists"}, status=409)
     except Exception as e:
         return Response({"error": f"Database Error: {str(e)}"}, status=500)
 
@@ -298,6 +491,58 @@ def my_orders(request):
         
     return render(request, "my_orders.html", {"orders": orders})
 
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def order_tracking(request, order_id):
+    """
+    One order's status, its shipments and its tracking history. Reads the
+    same Shipment rows agents and vendors update, by order id, instead of
+    re-serializing every order the way my_orders does.
+    """
+    order = get_object_or_404(Order.objects.only('id', 'order_number', 'status', 'tracked_location', 'delivered_at'),
+                              id=order_id, user=request.user)
+    return Response({
+        'order_id': order.id,
+        'order_number': order.order_number,
+        'status': order.status,
+        'tracked_location': order.tracked_location,
+        'delivered_at': order.delivered_at,
+        'shipments': ShipmentSerializer(shipments.for_order(order), many=True).data,
+        'history': OrderTrackingSerializer(order.tracking_history.all(), many=True).data,
+    })
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def notification_feed(request):
+    """The user's notifications, newest first, keyset-paginated, with the cached unread count"""
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(Notification.objects.filter(user=request.user), request)
+    response = paginator.get_paginated_response(NotificationSerializer(page, many=True).data)
+    response.data['unread_count'] = notifications.unread_count(request.user)
+    return response
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def notification_unread_count(request):
+    return Response({'unread_count': notifications.unread_count(request.user)})
+
+@api_view(['POST'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def notification_read(request, notification_id):
+    if not notifications.mark_read(request.user, notification_id):
+        return Response({'error': 'Notification not found or already read'}, status=404)
+    return Response({'unread_count': notifications.unread_count(request.user)})
+
+@api_view(['POST'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def notification_read_all(request):
+    return Response({'marked_read': notifications.mark_all_read(request.user), 'unread_count': 0})
+
 @api_view(['GET', 'POST'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])